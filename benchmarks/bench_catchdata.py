@@ -0,0 +1,78 @@
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from gzip import GzipFile
+from pathlib import Path
+
+from utils.catchdata import iter_catchdata
+from utils.crypto import xor_decrypt
+
+from .synthetic import make_catchdata
+
+KEY = "c88d016d261eb80ce4d6e41a510d4048"
+
+
+def legacy_process_catchdata(src, dst_dir):
+    """Whole-file decode, as ``DataMiner.process_catchdata`` used to do it"""
+    with open(src, "rb") as f:
+        cipher = f.read()
+    compressed = xor_decrypt(cipher, KEY)
+    plain = GzipFile(fileobj=io.BytesIO(compressed)).read().decode("utf-8")
+    for json_string in plain.split("\n")[:-1]:
+        data = json.loads(json_string)
+        for key in data.keys():
+            with (dst_dir / f"{key}.json").open("w", encoding="utf-8") as f:
+                json.dump(data[key], f, indent=4, ensure_ascii=False)
+
+
+def streaming_process_catchdata(src, dst_dir):
+    with open(src, "rb") as f:
+        for key, table in iter_catchdata(f, KEY):
+            with (dst_dir / f"{key}.json").open("w", encoding="utf-8") as f:
+                json.dump(table, f, indent=4, ensure_ascii=False)
+
+
+def measure(func, *args):
+    t0 = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        src = tmp / "catchdata.dat"
+        src.write_bytes(make_catchdata(args.tables, args.rows, KEY))
+        print(
+            f"catchdata {os.path.getsize(src) / 2**20:.1f} MiB, "
+            f"{args.tables} tables x {args.rows} rows"
+        )
+        outputs = {}
+        for label, func in [
+            ("legacy", legacy_process_catchdata),
+            ("streaming", streaming_process_catchdata),
+        ]:
+            dst = tmp / label
+            dst.mkdir()
+            t, peak = measure(func, src, dst)
+            outputs[label] = {p.name: p.read_bytes() for p in dst.iterdir()}
+            print(f"{label:>9}: {t:.2f}s, peak {peak / 2**20:.1f} MiB")
+        assert outputs["legacy"] == outputs["streaming"], "output mismatch"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from utils.format_stc import format_stc
+
+from .synthetic import make_stc, random_type_ids
+
+MAPPING_DIR = Path(__file__).parents[1] / "dataminer/stc-mapping"
+
+
+def measure(func, *args, **kwargs):
+    """Return ``(seconds, peak traced bytes, retained traced bytes)`` of a call
+
+    The call is timed untraced first, tracemalloc slows allocation down a lot.
+    """
+    t0 = time.perf_counter()
+    func(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--tables", nargs="+", default=["3081/5016", "3081/5000"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stc = os.path.join(tmp, "bench.stc")
+        for table in args.tables:
+            mapping = MAPPING_DIR / f"{table}.json"
+            ncol = len(json.loads(mapping.read_text())["fields"])
+            type_ids = random_type_ids(ncol)
+            for rows in args.rows:
+                Path(stc).write_bytes(make_stc(type_ids, rows, long=True))
+                for columnar in [False, True]:
+                    t, peak, retained = measure(
+                        format_stc, stc, mapping, True, columnar=columnar
+                    )
+                    print(
+                        f"{table} cols={ncol} rows={rows} "
+                        f"{'columnar' if columnar else 'records '}: "
+                        f"{t:.3f}s, peak {peak / 2**20:.1f} MiB, "
+                        f"retained {retained / 2**20:.1f} MiB"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.format_stc import StcReader, format_stc
+
+from .synthetic import make_stc, random_type_ids
+from .timing import best_of
+
+MAPPING_DIR = Path(__file__).parents[1] / "dataminer/stc-mapping"
+
+
+def legacy_format_stc(stc, mapping, long=False):
+    """Per-cell ``StcReader`` decoding, as ``format_stc`` used to do it"""
+    with open(mapping, "r") as f:
+        stc_conf = json.load(f)
+    reader = StcReader(stc)
+    reader.read_ushort()
+    reader.skip_bytes(2 if not long else 4)
+    row = reader.read_ushort() if not long else reader.read_int()
+    if row == 0:
+        return stc_conf["name"], []
+    col = reader.read_byte()
+    type_ids = [reader.read_byte() for _ in range(col)]
+    fields = stc_conf["fields"][: len(type_ids)]
+    fields += [f"unk_{i}" for i in range(len(fields), len(type_ids))]
+    reader.skip_bytes(4)
+    reader.seek(reader.read_int())
+    data = []
+    for _ in range(row):
+        record = OrderedDict()
+        for key, id in zip(fields, type_ids):
+            record[key] = reader.read(id)
+        data.append(record)
+    return stc_conf["name"], data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--table", default="3081/5016")
+    args = parser.parse_args()
+
+    mapping = MAPPING_DIR / f"{args.table}.json"
+    ncol = len(json.loads(mapping.read_text())["fields"])
+    with tempfile.TemporaryDirectory() as tmp:
+        for strings in [True, False]:
+            type_ids = random_type_ids(ncol, strings=strings)
+            for rows in args.rows:
+                stc = os.path.join(tmp, "bench.stc")
+                Path(stc).write_bytes(make_stc(type_ids, rows, long=True))
+                t_old, old = best_of(legacy_format_stc, stc, mapping, True)
+                t_new, new = best_of(format_stc, stc, mapping, True)
+                assert json.dumps(old, indent=4, ensure_ascii=False) == json.dumps(
+                    new, indent=4, ensure_ascii=False
+                ), "output mismatch"
+                print(
+                    f"{args.table} cols={ncol} rows={rows} strings={strings}: "
+                    f"legacy {rows / t_old:,.0f} rows/s, "
+                    f"compiled {rows / t_new:,.0f} rows/s "
+                    f"({t_old / t_new:.1f}x)"
+                )
+
+
+if __name__ == "__main__":
+    main()
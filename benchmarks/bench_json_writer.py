@@ -0,0 +1,44 @@
+import argparse
+import random
+
+from utils import json_writer
+
+from .synthetic import make_catchdata_tables, random_type_ids, random_value
+from .timing import best_of
+
+
+def stc_like_table(ncol, rows, seed=0):
+    rng = random.Random(seed)
+    type_ids = random_type_ids(ncol, seed=seed)
+    fields = [f"field_{i}" for i in range(ncol)]
+    return [
+        {key: random_value(rng, t) for key, t in zip(fields, type_ids)}
+        for _ in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 20000])
+    parser.add_argument("--cols", type=int, default=20)
+    args = parser.parse_args()
+
+    if json_writer.orjson is None:
+        print("orjson is not installed, only the stdlib backend is available")
+    for rows in args.rows:
+        _, catchdata = next(make_catchdata_tables(1, rows, random.Random(0)))
+        tables = [("stc", stc_like_table(args.cols, rows)), ("catchdata", catchdata)]
+        for label, table in tables:
+            t_std, expected = best_of(json_writer.dumps_stdlib, table)
+            t_fast, out = best_of(json_writer.dumps, table)
+            assert out == expected, "output mismatch"
+            mib = len(out) / 2**20
+            print(
+                f"{label} rows={rows} ({mib:.1f} MiB): "
+                f"stdlib {mib / t_std:.1f} MiB/s, "
+                f"json_writer {mib / t_fast:.1f} MiB/s ({t_std / t_fast:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
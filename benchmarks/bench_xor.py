@@ -0,0 +1,48 @@
+import argparse
+import os
+
+from utils.crypto import XorStream, xor_decrypt
+
+from .timing import best_of
+
+KEY = "c88d016d261eb80ce4d6e41a510d4048"
+
+
+def legacy_xor_decrypt(cipher, key):
+    """Per-byte list comprehension, as ``xor_decrypt`` used to do it"""
+    key = key.encode("utf-8")
+    lk = len(key)
+    plain = [c ^ key[i % lk] for i, c in enumerate(cipher)]
+    return bytes(plain)
+
+
+def chunked(cipher, key, chunk_size):
+    stream = XorStream(key)
+    return b"".join(
+        stream.update(cipher[i : i + chunk_size])
+        for i in range(0, len(cipher), chunk_size)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2**10, 2**16, 2**22])
+    parser.add_argument("--chunk", type=int, default=2**16 + 7)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        cipher = os.urandom(size)
+        t_old, old = best_of(legacy_xor_decrypt, cipher, KEY)
+        t_new, new = best_of(xor_decrypt, cipher, KEY)
+        t_chunk, chunk = best_of(chunked, cipher, KEY, args.chunk)
+        assert old == new == chunk, "output mismatch"
+        mb = size / 2**20
+        print(
+            f"{size:>9} bytes: legacy {mb / t_old:8.1f} MiB/s, "
+            f"tiled {mb / t_new:8.1f} MiB/s ({t_old / t_new:.0f}x), "
+            f"chunked {mb / t_chunk:8.1f} MiB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
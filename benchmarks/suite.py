@@ -0,0 +1,192 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from dataminer.data_miner import ASSET_ROOTS, DataMiner, _format_hjson_file
+from dataminer.mapping import MappingIndex
+from utils import json_writer
+from utils.asset_extractor import unpack_all_assets
+from utils.crypto import xor_decrypt
+from utils.format_stc import format_stc
+
+from .synthetic import (
+    make_bundle,
+    make_bundle_assets,
+    make_catchdata,
+    make_stc,
+    random_type_ids,
+)
+from .timing import best_of
+
+DAT_KEY = "c88d016d261eb80ce4d6e41a510d4048"
+LUA_KEY = "lvbb3zfc3faa8mq1rx0r0gl61b4338fa"
+
+
+def bench_stc(tmp: Path, rows, repeat, tables):
+    """format_stc, json and hjson writes of real schemas in both stc layouts"""
+    index = MappingIndex.from_dir()
+    version = index.versions[-1]
+    for table_id in tables:
+        schema = index.schema(version, table_id)
+        type_ids = random_type_ids(len(schema["fields"]), seed=int(table_id))
+        stc = str(tmp / f"{table_id}.stc")
+        # the short layout counts rows in an unsigned short
+        for long in [False, True] if rows < 1 << 16 else [True]:
+            layout = "long" if long else "short"
+            Path(stc).write_bytes(
+                make_stc(type_ids, rows, long=long, code=int(table_id))
+            )
+            t, _ = best_of(format_stc, stc, schema, long, repeat=repeat)
+            yield "format_stc", f"{table_id} {layout}", os.path.getsize(stc), t
+        # the long layout is written last
+        _, table = format_stc(stc, schema, True)
+        size = len(json_writer.dumps(table))
+        for label, dumps in [
+            ("stdlib", json_writer.dumps_stdlib),
+            ("json_writer", json_writer.dumps),
+        ]:
+            t, _ = best_of(dumps, table, repeat=repeat)
+            yield "json_write", f"{table_id} {label}", size, t
+        dst = tmp / f"{table_id}.hjson"
+        t, _ = best_of(
+            lambda t: _format_hjson_file(t, dst),
+            repeat=repeat,
+            setup=lambda: (copy.deepcopy(table),),
+        )
+        yield "hjson_write", table_id, dst.stat().st_size, t
+
+
+def bench_xor(tmp: Path, rows, repeat):
+    cipher = os.urandom(rows << 10)
+    t, _ = best_of(xor_decrypt, cipher, DAT_KEY, repeat=repeat)
+    yield "xor", "xor_decrypt", len(cipher), t
+
+
+def bench_catchdata(tmp: Path, rows, repeat):
+    """process_catchdata into a fresh and into an unchanged data repo"""
+    miner = DataMiner(data_dir=tmp / "repo", dat_key=DAT_KEY, workers=1)
+    src = Path(miner.tmp_dir.name) / "stc/catchdata.dat"
+    src.parent.mkdir(parents=True)
+    src.write_bytes(make_catchdata(10, rows, DAT_KEY))
+
+    def fresh():
+        shutil.rmtree(miner.data_dir, ignore_errors=True)
+        miner.memos.pop("changes", None)
+        return ()
+
+    t, _ = best_of(miner.process_catchdata, repeat=repeat, setup=fresh)
+    yield "process_catchdata", "cold", src.stat().st_size, t
+    t, _ = best_of(miner.process_catchdata, repeat=repeat)
+    yield "process_catchdata", "warm", src.stat().st_size, t
+
+
+def bench_unpack(tmp: Path, rows, repeat):
+    """unpack_all_assets of a bundle with luapatch, tables and MonoBehaviours"""
+    bundle = tmp / "synthetic.ab"
+    bundle.write_bytes(make_bundle(list(make_bundle_assets(4, 4, 4, rows, LUA_KEY))))
+    dst = tmp / "repo"
+
+    def unpack():
+        unpack_all_assets(
+            str(bundle),
+            str(tmp),
+            exclude=["*.asset"],
+            routes={k: str(dst / v) for k, v in ASSET_ROOTS.items()},
+            decrypt={"assets/resources/dabao/luapatch": LUA_KEY},
+        )
+
+    t, _ = best_of(unpack, repeat=repeat, setup=lambda: shutil.rmtree(dst, True) or ())
+    yield "unpack", "cold", bundle.stat().st_size, t
+    t, _ = best_of(unpack, repeat=repeat)
+    yield "unpack", "warm", bundle.stat().st_size, t
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["stage"], r["variant"], r["rows"]): r["seconds"]
+            for r in json.load(f)["results"]
+        }
+    print(f"Compared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["stage"], r["variant"], r["rows"]))
+        if old:
+            print(
+                f"  {r['stage']} {r['variant']} rows={r['rows']}: "
+                f"{r['seconds'] / old:.2f}x the baseline time"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time every pipeline stage on synthetic data, no network needed"
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--tables", nargs="+", default=["5000", "5016"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    stages = [
+        partial(bench_stc, tables=args.tables),
+        bench_xor,
+        bench_catchdata,
+        bench_unpack,
+    ]
+    results = []
+    for rows in args.rows:
+        for stage in stages:
+            with tempfile.TemporaryDirectory() as tmp:
+                for name, variant, size, t in stage(Path(tmp), rows, args.repeat):
+                    mib = size / 2**20
+                    print(
+                        f"{name} {variant} rows={rows}: {t:.4f}s, "
+                        f"{mib:.2f} MiB at {mib / t:.1f} MiB/s"
+                    )
+                    results.append(
+                        dict(
+                            stage=name,
+                            variant=variant,
+                            rows=rows,
+                            bytes=size,
+                            seconds=t,
+                        )
+                    )
+
+    report = dict(
+        commit=git_commit(),
+        time=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        python=sys.version.split()[0],
+        platform=platform.platform(),
+        orjson=json_writer.orjson is not None,
+        args=vars(args),
+        results=results,
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
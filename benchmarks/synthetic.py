@@ -0,0 +1,231 @@
+import gzip
+import json
+import random
+import struct
+
+from utils.crypto import xor_tiled
+from utils.format_stc import STC_FORMATS
+
+
+def random_value(rng: random.Random, type_id: int):
+    if type_id == 1:
+        return rng.randint(-128, 127)
+    if type_id == 5:
+        return rng.choice([0, 0, 1, rng.randint(-(2**31), 2**31 - 1)])
+    if type_id == 8:
+        return rng.randint(-(2**63), 2**63 - 1)
+    if type_id == 9:
+        return rng.choice([0.0, 0.5, rng.uniform(-1e4, 1e4)])
+    if type_id == 11:
+        n = rng.choice([0, 3, 12, 60])
+        return "".join(rng.choice("abc,;:0123456789人形梯队") for _ in range(n))
+    raise KeyError(type_id)
+
+
+def make_stc(type_ids, rows, long=False, code=5000, seed=0) -> bytes:
+    """Build an stc file in the layout read by ``utils.format_stc``"""
+    rng = random.Random(seed)
+    header = struct.pack("<H", code) + bytes(2 if not long else 4)
+    header += struct.pack("<H" if not long else "<i", rows)
+    header += struct.pack("<b", len(type_ids))
+    header += struct.pack(f"<{len(type_ids)}b", *type_ids)
+    offset = len(header) + 8
+    header += bytes(4) + struct.pack("<i", offset)
+    body = bytearray()
+    for _ in range(rows):
+        for t in type_ids:
+            v = random_value(rng, t)
+            if isinstance(v, str):
+                b = v.encode("utf-8")
+                body += b"\x00" + struct.pack("<H", len(b)) + b
+            else:
+                body += struct.pack("<" + STC_FORMATS[t], v)
+    return bytes(header + body)
+
+
+def random_type_ids(ncol, strings=True, seed=0):
+    rng = random.Random(seed)
+    choices = [1, 5, 5, 5, 8, 9] + ([11, 11] if strings else [])
+    return [5] + [rng.choice(choices) for _ in range(ncol - 1)]
+
+
+def make_catchdata_tables(tables: int, rows: int, rng: random.Random):
+    """``(name, records)`` pairs shaped like the catchdata tables"""
+    for t in range(tables):
+        table = [
+            {
+                "id": i,
+                "name": random_value(rng, 11),
+                "value": random_value(rng, 5),
+                "rate": random_value(rng, 9),
+            }
+            for i in range(rows)
+        ]
+        yield f"table_{t}", table
+
+
+def make_catchdata(tables: int, rows: int, key: str, seed=0) -> bytes:
+    """Build an XOR'd gzip catchdata.dat, one ``{name: table}`` json per line"""
+    lines = [
+        json.dumps({name: table}, ensure_ascii=False)
+        for name, table in make_catchdata_tables(tables, rows, random.Random(seed))
+    ]
+    plain = ("\n".join(lines) + "\n").encode("utf-8")
+    return xor_tiled(gzip.compress(plain), key.encode("utf-8"))
+
+
+def _aligned(data: bytes, alignment=4) -> bytes:
+    return data + bytes(-len(data) % alignment)
+
+
+def _aligned_str(s: str) -> bytes:
+    b = s.encode("utf-8")
+    return _aligned(struct.pack("<i", len(b)) + b)
+
+
+def _pptr(path_id=0) -> bytes:
+    return struct.pack("<iq", 0, path_id)
+
+
+# (level, type, name, byte size, is array, meta flag) of the MonoBehaviour
+# fields written by ``_mono_behaviour``
+_MONO_NODES = [
+    (0, "MonoBehaviour", "Base", -1, 0, 0),
+    (1, "PPtr<GameObject>", "m_GameObject", 12, 0, 0),
+    (2, "int", "m_FileID", 4, 0, 0),
+    (2, "SInt64", "m_PathID", 8, 0, 0),
+    (1, "UInt8", "m_Enabled", 1, 0, 0x4000),
+    (1, "PPtr<MonoScript>", "m_Script", 12, 0, 0),
+    (2, "int", "m_FileID", 4, 0, 0),
+    (2, "SInt64", "m_PathID", 8, 0, 0),
+    (1, "string", "m_Name", -1, 0, 0x8000),
+    (2, "Array", "Array", -1, 1, 0x4001),
+    (3, "int", "size", 4, 0, 1),
+    (3, "char", "data", 1, 0, 1),
+    (1, "vector", "ids", -1, 0, 0),
+    (2, "Array", "Array", -1, 1, 0x4000),
+    (3, "int", "size", 4, 0, 0),
+    (3, "int", "data", 4, 0, 0),
+    (1, "vector", "names", -1, 0, 0),
+    (2, "Array", "Array", -1, 1, 0x4000),
+    (3, "int", "size", 4, 0, 0),
+    (3, "string", "data", -1, 0, 0x8000),
+    (4, "Array", "Array", -1, 1, 0x4001),
+    (5, "int", "size", 4, 0, 1),
+    (5, "char", "data", 1, 0, 1),
+]
+
+
+def _type_tree(nodes) -> bytes:
+    strings, offsets, packed = bytearray(), {}, []
+    for level, type_, name, size, is_array, flag in nodes:
+        for s in (type_, name):
+            if s not in offsets:
+                offsets[s] = len(strings)
+                strings += s.encode() + b"\0"
+        index = len(packed)
+        offset = offsets[type_], offsets[name]
+        packed.append(
+            struct.pack("<hb?IIiii", 1, level, is_array, *offset, size, index, flag)
+        )
+    return struct.pack("<ii", len(nodes), len(strings)) + b"".join(packed) + strings
+
+
+def _mono_behaviour(name: str, ids, names) -> bytes:
+    data = _pptr() + _aligned(b"\x01") + _pptr() + _aligned_str(name)
+    data += struct.pack(f"<i{len(ids)}i", len(ids), *ids)
+    data += struct.pack("<i", len(names)) + b"".join(map(_aligned_str, names))
+    return data
+
+
+def make_serialized_file(assets, unity_version="2018.4.30f1") -> bytes:
+    """Build a version 17 serialized file holding ``assets`` and their container
+
+    ``assets`` are ``(container path, content)`` pairs, bytes become a
+    TextAsset and ``(ids, names)`` a MonoBehaviour with a type tree.
+    """
+    classes = [(142, b""), (49, b""), (114, _type_tree(_MONO_NODES))]
+    objects = []  # (type index, data)
+    container = b""
+    for path_id, (path, content) in enumerate(assets, start=2):
+        name = path.rsplit("/", 1)[-1].split(".", 1)[0]
+        if isinstance(content, bytes):
+            data = _aligned_str(name) + _aligned(
+                struct.pack("<i", len(content)) + content
+            )
+            objects.append((1, data))
+        else:
+            objects.append((2, _mono_behaviour(name, *content)))
+        container += _aligned_str(path) + struct.pack("<ii", 0, 0) + _pptr(path_id)
+    bundle = _aligned_str("synthetic") + struct.pack("<i", 0)
+    bundle += struct.pack("<i", len(assets)) + container
+    objects.insert(0, (0, bundle))
+
+    meta = bytearray(unity_version.encode() + b"\0")
+    meta += struct.pack("<i?i", 13, True, len(classes))  # android, type trees on
+    for class_id, tree in classes:
+        meta += struct.pack("<i?h", class_id, False, -1)
+        if class_id == 114:
+            meta += bytes(16)  # script id
+        meta += bytes(16) + (tree or struct.pack("<ii", 0, 0))
+    meta += struct.pack("<i", len(objects))
+    data = bytearray()
+    for path_id, (type_index, obj) in enumerate(objects, start=1):
+        meta += bytes(-(20 + len(meta)) % 4)
+        data += bytes(-len(data) % 8)
+        meta += struct.pack("<qIIi", path_id, len(data), len(obj), type_index)
+        data += obj
+    meta += struct.pack("<ii", 0, 0) + b"\0"  # scripts, externals, user info
+    data_offset = 20 + len(meta)
+    data_offset += -data_offset % 16
+    size = data_offset + len(data)
+    header = struct.pack(">IIII", len(meta), size, 17, data_offset) + bytes(4)
+    return bytes(_aligned(header + meta, 16) + data)
+
+
+def make_bundle(assets, unity_version="2018.4.30f1", lz4=True) -> bytes:
+    """Build a UnityFS asset bundle holding one ``make_serialized_file``
+
+    The data block is LZ4 compressed like the game's bundles if the lz4
+    package is installed.
+    """
+    cab = make_serialized_file(assets, unity_version)
+    block, flags = cab, 0
+    if lz4:
+        try:
+            import lz4.block
+        except ImportError:
+            pass
+        else:
+            block, flags = lz4.block.compress(cab, store_size=False), 3
+    name = b"CAB-synthetic\0"
+    info = bytes(16) + struct.pack(">iIIH", 1, len(cab), len(block), flags)
+    info += struct.pack(">iqqI", 1, 0, len(cab), 4) + name
+    header = b"UnityFS\0" + struct.pack(">I", 6) + b"5.x.x\0"
+    header += unity_version.encode() + b"\0"
+    size = len(header) + 20 + len(info) + len(block)
+    header += struct.pack(">qIII", size, len(info), len(info), 0x40)
+    return header + info + block
+
+
+def make_bundle_assets(luapatch, tables, behaviours, rows, key: str, seed=0):
+    """Container entries shaped like the dabao bundles
+
+    XOR'd luapatch ``.txt`` files, ``key,text`` tables and MonoBehaviours
+    with ``rows`` entries each.
+    """
+    rng = random.Random(seed)
+    prefix = "assets/resources/dabao"
+    for i in range(luapatch):
+        lua = "\n".join(f"local v{j} = {random_value(rng, 5)}" for j in range(rows))
+        cipher = xor_tiled(lua.encode("utf-8"), key.encode("utf-8"))
+        yield f"{prefix}/luapatch/patch_{i}.lua.txt", cipher
+    for i in range(tables):
+        text = "".join(
+            f"table-{i}-{j},{random_value(rng, 11)}\n" for j in range(rows)
+        )
+        yield f"{prefix}/table/table_{i}.txt", text.encode("utf-8")
+    for i in range(behaviours):
+        ids = [rng.randint(0, 1 << 20) for _ in range(rows)]
+        names = [random_value(rng, 11) for _ in range(rows)]
+        yield f"{prefix}/config/behaviour_{i}.json", (ids, names)
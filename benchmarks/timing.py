@@ -0,0 +1,21 @@
+import time
+
+
+def best_of(func, *args, repeat=3, setup=None):
+    """Best wall time of ``repeat`` calls of ``func(*args)`` and the last result
+
+    ``setup`` runs untimed before each call, the tuple it returns is passed on
+    after ``args``.
+    """
+
+    def timed():
+        extra = setup() if setup is not None else ()
+        t0 = time.perf_counter()
+        result = func(*args, *extra)
+        return time.perf_counter() - t0, result
+
+    best, result = timed()
+    for _ in range(repeat - 1):
+        t, result = timed()
+        best = min(best, t)
+    return best, result
@@ -15,7 +15,6 @@ from urllib import request
 from zipfile import ZipFile
 
 import hjson
-import pandas as pd
 import pyjson5
 from compact_json.formatter import EolStyle, Formatter
 from gf_utils.stc_data import get_stc_data
@@ -1,13 +1,211 @@
 import argparse
+import io
+import json
+import logging
 import os
 import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import ContextVar
+from typing import Dict, Optional
 
 from logger_tt import logger, setup_logging
 
 from .data_miner import DataMiner, GithubEnv
+from .selection import Selection
+from .stages import STAGES, StageStats
 
 socket.setdefaulttimeout(10)
 
+# miners and stage stats of every region started, failed ones included
+miners: Dict[str, DataMiner] = {}
+stage_stats: Dict[str, StageStats] = {}
+
+
+class RegionBuffer:
+    """Output of one region, every line prefixed with its name"""
+
+    def __init__(self, region: str):
+        self.prefix = f"[{region.upper()}] "
+        self.buffer = io.StringIO()
+        self.newline = True
+        self.lock = threading.Lock()
+
+    def write(self, s: str):
+        with self.lock:
+            for line in s.splitlines(keepends=True):
+                if self.newline:
+                    self.buffer.write(self.prefix)
+                self.buffer.write(line)
+                self.newline = line.endswith("\n")
+
+
+class RegionOutput(io.TextIOBase):
+    """Stdout proxy buffering the output of region worker threads
+
+    Lines written between ``begin`` and ``end`` are prefixed with the region
+    and kept apart, so each region can be printed as one block. The region is
+    held in a context variable, download and http pool threads run their
+    tasks in a copy of the submitting context and write to the same block.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.current: ContextVar[Optional[RegionBuffer]] = ContextVar(
+            "region_output", default=None
+        )
+
+    def begin(self, region: str):
+        self.current.set(RegionBuffer(region))
+
+    def end(self) -> str:
+        region = self.current.get()
+        self.current.set(None)
+        return "" if region is None else region.buffer.getvalue()
+
+    def write(self, s: str):
+        region = self.current.get()
+        if region is None:
+            return self.stream.write(s)
+        region.write(s)
+        return len(s)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def make_miner(region, args) -> DataMiner:
+    return DataMiner(
+        region=region,
+        # selected outputs are kept apart from the checkout of the data repo
+        data_dir=os.path.join(args.select_dir if args.select else "data", region),
+        github_repo=f"gf-data-tools/gf-data-{region}",
+        github_token=args.github_token,
+        git_author="ZeroRin <ZeroRin@users.noreply.github.com>",
+        dingtalk_token=args.dingtalk_token,
+        qq_channel=args.qq_channel,
+        qq_token=args.qq_token,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size << 20,
+        table_memory=None if args.table_memory is None else args.table_memory << 20,
+        repo_cache=args.repo_cache,
+        sparse=args.sparse,
+        mapping_bundle=args.mapping_bundle,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        select=args.select,
+        capture_dir=args.capture and os.path.join(args.capture, region),
+        replay_dir=args.replay and os.path.join(args.replay, region),
+    )
+
+
+def prefetch_regions(args):
+    """Request the metadata of all regions at once, ahead of their runs
+
+    Failures are only logged, the region's own run requests it again.
+    """
+
+    def prefetch(region):
+        try:
+            miners[region].prefetch_metadata()
+        except Exception as e:
+            logger.warning(f"Prefetching {region} metadata failed: {e!r}")
+
+    for region in args.region:
+        miners[region] = make_miner(region, args)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(len(args.region)) as pool:
+        list(pool.map(prefetch, args.region))
+    logger.info(f"Prefetched metadata in {time.perf_counter() - t0:.2f}s")
+
+
+def run_region(region: str, args) -> str:
+    data_miner = miners.get(region) or make_miner(region, args)
+    stage_stats[region] = data_miner.stages
+    if data_miner.selection:
+        data_miner.extract_selected()
+        return f"extracted {data_miner.selection}, not committed"
+    check = data_miner.probe_update if args.probe else data_miner.update_available
+    if not (args.force or check()):
+        return "up to date"
+    data_miner.repo
+    if args.incremental:
+        data_miner.extract_incremental()
+    else:
+        data_miner.extract_all()
+    if args.replay:
+        data_miner.commit_repo(push=False)
+        return f"replayed, git {data_miner.repo_manager.report()}"
+    committed = data_miner.commit_repo(push=True)
+    logger.info(f"git timings: {data_miner.repo_manager.report()}")
+    if committed:
+        GithubEnv()["update_detected"] = "true"
+        return f"updated, git {data_miner.repo_manager.report()}"
+    return f"nothing committed, git {data_miner.repo_manager.report()}"
+
+
+def run_captured(output: RegionOutput, region: str, args):
+    output.begin(region)
+    t0 = time.perf_counter()
+    try:
+        status = run_region(region, args)
+    except Exception as e:
+        logger.exception(repr(e))
+        status = "failed"
+    finally:
+        text = output.end()
+    return status, time.perf_counter() - t0, text
+
+
+def run_parallel(args) -> dict:
+    output = RegionOutput(sys.stdout)
+    streams = {}
+    for hdlr in logging.getLogger().handlers:
+        if isinstance(hdlr, logging.StreamHandler) and not isinstance(
+            hdlr, logging.FileHandler
+        ):
+            streams[hdlr] = hdlr.setStream(output)
+    sys.stdout = output
+    results = {}
+    try:
+        with ThreadPoolExecutor(args.parallel) as pool:
+            futures = {
+                pool.submit(run_captured, output, region, args): region
+                for region in args.region
+            }
+            for future in as_completed(futures):
+                region = futures[future]
+                status, seconds, text = future.result()
+                results[region] = status, seconds
+                print(f"::group::{region.upper()} Server")
+                print(text, end="" if text.endswith("\n") or not text else "\n")
+                print("::endgroup::", flush=True)
+    finally:
+        sys.stdout = output.stream
+        for hdlr, stream in streams.items():
+            hdlr.setStream(stream)
+    return results
+
+
+def run_serial(args) -> dict:
+    results = {}
+    for region in args.region:
+        t0 = time.perf_counter()
+        try:
+            print(f"::group::{region.upper()} Server")
+            status = run_region(region, args)
+        except Exception as e:
+            logger.exception(repr(e))
+            status = "failed"
+            print()
+        finally:
+            print("::endgroup::")
+        results[region] = status, time.perf_counter() - t0
+    return results
+
 
 def cli():
     parser = argparse.ArgumentParser()
@@ -15,6 +213,17 @@ def cli():
         "region", nargs="+", choices=["ch", "tw", "kr", "us", "jp", "at"]
     )
     parser.add_argument("--force", "-f", action="store_true")
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="check for updates with conditional requests and persisted probe state",
+    )
+    parser.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="only rebuild outputs affected by changed bundles and stc data",
+    )
     parser.add_argument(
         "--loglevel",
         default="INFO",
@@ -25,43 +234,119 @@ def cli():
     parser.add_argument("--dingtalk_token", type=str, default="")
     parser.add_argument("--qq_channel", type=str, default="")
     parser.add_argument("--qq_token", type=str, default="")
+    parser.add_argument(
+        "--cache_dir", type=str, default=None, help="persistent download cache"
+    )
+    parser.add_argument(
+        "--cache_size", type=int, default=2048, help="cache size limit in MiB"
+    )
+    parser.add_argument(
+        "--parallel",
+        "-p",
+        type=int,
+        default=1,
+        help="number of regions processed concurrently",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="process pool size, default cpu count"
+    )
+    parser.add_argument(
+        "--repo_cache",
+        type=str,
+        default=None,
+        help="keep bare mirrors of the data repos here and fetch incrementally",
+    )
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        help="check out only the top level files of the data repos",
+    )
+    parser.add_argument(
+        "--table_memory",
+        type=int,
+        default=None,
+        help="keep decoded tables in memory for formatting, up to this many MiB",
+    )
+    parser.add_argument(
+        "--mapping_bundle",
+        type=str,
+        default=None,
+        help="read stc mappings from this bundle, built by python -m dataminer.mapping",
+    )
+    parser.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        choices=STAGES,
+        help="run this stage under cProfile, may be repeated",
+    )
+    parser.add_argument(
+        "--profile_dir", type=str, default=".", help="where stage profiles are written"
+    )
+    parser.add_argument(
+        "--report", type=str, default=None, help="write per-region stage stats as json"
+    )
+    parser.add_argument(
+        "--select",
+        action="append",
+        default=[],
+        help="only extract these, e.g. stc:mission,gun catchdata:* "
+        "bundle:asset_texttable, may be repeated; nothing is committed",
+    )
+    parser.add_argument(
+        "--select_dir",
+        type=str,
+        default="selected",
+        help="where --select writes its outputs, one subdir per region",
+    )
+    snapshot = parser.add_mutually_exclusive_group()
+    snapshot.add_argument(
+        "--capture",
+        type=str,
+        default=None,
+        help="record the raw inputs of the run under this dir, one subdir per region",
+    )
+    snapshot.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        help="run offline on inputs recorded by --capture, commit locally, no push",
+    )
 
     args = parser.parse_args()
+    try:
+        Selection(args.select)
+    except ValueError as e:
+        parser.error(str(e))
 
     logger_cfg = setup_logging(log_path=os.devnull)
     for hdlr in logger_cfg.root_handlers:
         hdlr.setLevel(args.loglevel)
 
-    error = False
+    args.region = list(dict.fromkeys(args.region))
+    prefetch_regions(args)
+    if args.parallel > 1:
+        results = run_parallel(args)
+    else:
+        results = run_serial(args)
+
+    print("Summary:")
     for region in args.region:
-        try:
-            print(f"::group::{region.upper()} Server")
-            data_miner = DataMiner(
-                region=region,
-                data_dir=f"data/{region}",
-                github_repo=f"gf-data-tools/gf-data-{region}",
-                github_token=args.github_token,
-                git_author="ZeroRin <ZeroRin@users.noreply.github.com>",
-                dingtalk_token=args.dingtalk_token,
-                qq_channel=args.qq_channel,
-                qq_token=args.qq_token,
+        status, seconds = results[region]
+        print(f"  {region.upper()}: {status} ({seconds:.1f}s)")
+        if region in stage_stats:
+            for line in stage_stats[region].summary():
+                print(f"    {line}")
+    if args.report is not None:
+        report = {
+            region: dict(
+                status=results[region][0],
+                seconds=results[region][1],
+                stages=stage_stats[region].report() if region in stage_stats else {},
             )
-            if args.force or data_miner.update_available():
-                data_miner.repo
-                data_miner.clear_local_data()
-                data_miner.download_asset_bundles()
-                data_miner.unpack_assets()
-                data_miner.download_stc()
-                data_miner.process_stc()
-                data_miner.process_catchdata()
-                data_miner.format_hjson()
-                if data_miner.commit_repo(push=True):
-                    GithubEnv()["update_detected"] = "true"
-        except Exception as e:
-            logger.exception(repr(e))
-            error = True
-            print()
-        finally:
-            print("::endgroup::")
-    if error:
+            for region in args.region
+        }
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    if any(status == "failed" for status, _ in results.values()):
         raise RuntimeError("Error during execution")
@@ -0,0 +1,110 @@
+import argparse
+import bisect
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MAPPING_DIR = Path(__file__).parent / "stc-mapping"
+
+
+class MappingIndex:
+    """Stc mappings of every version, resolved ahead of time
+
+    ``sources`` maps each version to the table ids it ships a mapping for.
+    ``resolved`` maps each version to all table ids known at that point,
+    each pointing at the newest version not after it that has the table, so
+    that the stale fallback of a lookup is a single dict access. Schemas are
+    loaded once on first use, either from the json files of a mapping
+    directory or all at once from a packed bundle.
+    """
+
+    def __init__(self, sources: Dict[int, List[str]], loader):
+        self.loader = loader
+        self.schemas: Dict[Tuple[int, str], dict] = {}
+        self.versions = sorted(sources)
+        self.resolved: Dict[int, Dict[str, int]] = {}
+        current: Dict[str, int] = {}
+        for version in self.versions:
+            current = {**current, **dict.fromkeys(sources[version], version)}
+            self.resolved[version] = current
+
+    @classmethod
+    def from_dir(cls, mapping_dir=MAPPING_DIR) -> "MappingIndex":
+        """Index ``mapping_dir`` with one listing per version, json read lazily"""
+        mapping_dir = Path(mapping_dir)
+        sources = {}
+        for entry in os.scandir(mapping_dir):
+            if entry.is_dir() and entry.name.isdigit():
+                names = [n for n in os.listdir(entry.path) if n.endswith(".json")]
+                sources[int(entry.name)] = [n[: -len(".json")] for n in names]
+
+        def load(version, table_id):
+            with open(mapping_dir / str(version) / f"{table_id}.json", "r") as f:
+                return json.load(f)
+
+        return cls(sources, load)
+
+    @classmethod
+    def from_bundle(cls, path) -> "MappingIndex":
+        """Load every schema from a bundle written by ``write_bundle``"""
+        with gzip.open(path, "rb") as f:
+            bundle = json.load(f)
+        schemas = bundle["schemas"]
+        tables = {
+            int(version): {table_id: schemas[i] for table_id, i in ids.items()}
+            for version, ids in bundle["versions"].items()
+        }
+        index = cls({v: list(ids) for v, ids in tables.items()}, None)
+        index.schemas = {(v, t): s for v, ids in tables.items() for t, s in ids.items()}
+        return index
+
+    def resolve(self, min_version: int, table_id: str) -> Optional[int]:
+        """Version whose mapping of ``table_id`` applies to ``min_version``
+
+        That is ``min_version`` itself if it has one, else the newest earlier
+        version that does. None if no version up to ``min_version`` has it.
+        """
+        if min_version in self.resolved:
+            return self.resolved[min_version].get(table_id)
+        i = bisect.bisect_right(self.versions, min_version)
+        if i == 0:
+            return None
+        return self.resolved[self.versions[i - 1]].get(table_id)
+
+    def schema(self, version: int, table_id: str) -> dict:
+        key = version, table_id
+        if key not in self.schemas:
+            self.schemas[key] = self.loader(version, table_id)
+        return self.schemas[key]
+
+    def write_bundle(self, path):
+        """Pack all schemas into one gzipped json, identical ones stored once"""
+        schemas, ids, versions = [], {}, {}
+        for version in self.versions:
+            tables = versions[str(version)] = {}
+            for table_id in sorted(
+                t for t, v in self.resolved[version].items() if v == version
+            ):
+                schema = self.schema(version, table_id)
+                key = json.dumps(schema, ensure_ascii=False)
+                if key not in ids:
+                    ids[key] = len(schemas)
+                    schemas.append(schema)
+                tables[table_id] = ids[key]
+        data = json.dumps(
+            dict(versions=versions, schemas=schemas),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack the stc mappings into a bundle")
+    parser.add_argument("output", help="path of the gzipped bundle")
+    parser.add_argument("--mapping_dir", default=MAPPING_DIR)
+    args = parser.parse_args()
+    MappingIndex.from_dir(args.mapping_dir).write_bundle(args.output)
@@ -0,0 +1,35 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class ProbeState(dict):
+    """What the last update probe saw, persisted as a small json file
+
+    Holds the ETag and text of repo files fetched from raw.githubusercontent
+    and the remote identity and daBaoTime of the last decoded resdata. With
+    ``path`` None the state only lives for the current run. Threads updating
+    it hold ``lock`` around their change and the ``save`` that follows.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        super().__init__()
+        self.lock = threading.RLock()
+        self.path = None if path is None else Path(path)
+        if self.path is not None and self.path.exists():
+            try:
+                self.update(json.loads(self.path.read_text(encoding="utf-8")))
+            except ValueError:
+                pass
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            data = json.dumps(self, indent=2, ensure_ascii=False)
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
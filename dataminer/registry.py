@@ -0,0 +1,81 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+
+class TableRegistry:
+    """Tables decoded in this run, handed from the decode stages to formatting
+
+    Every table is registered together with the json file it was written to.
+    Tables stay in memory until their total serialized size exceeds
+    ``max_bytes``, then the oldest ones are dropped and read back from their
+    json file when asked for. A table registered again under the same name
+    replaces the earlier one.
+    """
+
+    def __init__(self, max_bytes=512 << 20):
+        self.max_bytes = max_bytes
+        self.paths: Dict[str, Path] = {}
+        self.tables: Dict[str, Tuple[list, int]] = {}
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def put(self, name: str, table: list, path: Path, size: int):
+        self.discard(name)
+        self.paths[name] = Path(path)
+        self.tables[name] = table, size
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            self.spill(next(iter(self.tables)))
+
+    def spill(self, name: str):
+        _, size = self.tables.pop(name)
+        self.nbytes -= size
+        logging.debug(f"spilled {name} ({size} bytes) to {self.paths[name]}")
+
+    def discard(self, name: str):
+        if name in self.tables:
+            self.spill(name)
+        self.paths.pop(name, None)
+
+    def get(self, name: str) -> list:
+        if name in self.tables:
+            return self.tables[name][0]
+        with self.paths[name].open(encoding="utf-8") as f:
+            return json.load(f)
+
+    def items(self) -> Iterator[Tuple[str, list]]:
+        for name in list(self.paths):
+            yield name, self.get(name)
+
+    def spilled(self) -> List[str]:
+        return [name for name in self.paths if name not in self.tables]
+
+    def clear(self):
+        self.paths.clear()
+        self.tables.clear()
+        self.nbytes = 0
+
+
+def load_text_table(table_dir: Path) -> Dict[str, str]:
+    """``key,text`` lines of the unpacked ``asset/table/*.txt`` files"""
+    if not Path(table_dir).is_dir():
+        # formatted tables would silently keep their text ids
+        raise FileNotFoundError(f"text table directory {table_dir} not found")
+    text = {}
+    for file in sorted(Path(table_dir).glob("*.txt")):
+        with file.open(encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.rstrip("\r\n").partition(",")
+                if sep:
+                    text[key] = value
+    return text
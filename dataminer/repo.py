@@ -0,0 +1,193 @@
+import os
+import re
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from git import Git
+from git.repo import Repo
+from logger_tt import logger
+
+from utils.outputs import CREATED, DELETED, MODIFIED, ChangeSet
+
+# top level files only, enough for version checks and incremental extraction
+SPARSE_TOP_LEVEL = ["/*", "!/*/"]
+AUTHOR = re.compile(r"(.*?)\s*<(.*)>")
+
+
+class RepoManager:
+    """Clones of the data repos and a commit path that skips the working tree
+
+    With ``cache_dir`` set a shallow bare mirror of every repo is kept there,
+    created once and then brought up to date with an incremental fetch, and
+    working trees are cloned from it locally instead of over the network.
+    Without it repos are cloned from the remote with depth 1. Durations of
+    the git operations are summed up in ``timings``.
+    """
+
+    def __init__(self, cache_dir=None, depth=1):
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        self.depth = depth
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+            logger.info(f"git {stage} took {elapsed:.2f}s")
+
+    def report(self) -> str:
+        return ", ".join(f"{k} {v:.1f}s" for k, v in self.timings.items())
+
+    def mirror(self, url: str, name: str) -> Path:
+        """Create or fetch the bare mirror of ``url``, return its path
+
+        ``url`` may carry credentials, it is passed on every fetch and never
+        stored in the mirror's config.
+        """
+        assert self.cache_dir is not None, "cache_dir not set"
+        path = self.cache_dir / f"{name}.git"
+        if (path / "HEAD").exists():
+            with self.timed("fetch"):
+                Git(path).fetch(
+                    url, "+refs/heads/*:refs/heads/*", depth=self.depth, prune=True
+                )
+        else:
+            with self.timed("clone"):
+                repo = Repo.clone_from(url, path, bare=True, depth=self.depth)
+                repo.delete_remote(repo.remote())
+        return path
+
+    def checkout(
+        self, url: str, name: str, dst: Path, sparse: Optional[List[str]] = None
+    ) -> Repo:
+        """Clone ``url`` into ``dst``, only the non-cone ``sparse`` patterns if set"""
+        if self.cache_dir is None:
+            with self.timed("clone"):
+                repo = Repo.clone_from(
+                    url, dst, depth=self.depth, no_checkout=sparse is not None
+                )
+        else:
+            source = self.mirror(url, name)
+            with self.timed("checkout"):
+                repo = Repo.clone_from(
+                    str(source), dst, no_checkout=sparse is not None
+                )
+        if sparse is not None:
+            with self.timed("checkout"):
+                repo.git.sparse_checkout("set", "--no-cone", *sparse)
+                repo.git.checkout()
+        repo.remote().set_url(url)
+        return repo
+
+    def pending_changes(self, repo: Repo) -> Dict[str, str]:
+        """Paths of the working tree that differ from HEAD, with their status
+
+        These are left behind by interrupted runs or failed commits, outputs
+        rewritten only when they change would never pick them up again.
+        Skip-worktree entries of a sparse checkout are not reported missing.
+        """
+        pending: Dict[str, str] = {}
+        if repo.head.is_valid():
+            diff = repo.git.diff("HEAD", "--name-status", "--no-renames", "-z")
+            fields = diff.split("\0")
+            for status, path in zip(fields[::2], fields[1::2]):
+                pending[path] = DELETED if status == "D" else MODIFIED
+        else:
+            for path in filter(None, repo.git.ls_files("-z").split("\0")):
+                pending[path] = CREATED
+        untracked = repo.git.ls_files("-o", "--exclude-standard", "-z").split("\0")
+        pending.update(dict.fromkeys(filter(None, untracked), CREATED))
+        return pending
+
+    def file_modes(self, repo: Repo, paths: List[str], env=None) -> Dict[str, str]:
+        """Index modes of ``paths`` the way ``git add`` would record them
+
+        Files are 100755 if executable and 100644 otherwise. Without
+        ``core.fileMode`` the executable bit is not trusted and paths keep
+        their mode in the index ``env`` points to.
+        """
+        root = Path(str(repo.working_tree_dir))
+        if repo.config_reader().get_value("core", "filemode", True):
+            return {
+                p: "100755" if os.stat(root / p).st_mode & stat.S_IXUSR else "100644"
+                for p in paths
+            }
+        indexed = {}
+        for entry in filter(None, repo.git.ls_files("-s", "-z", env=env).split("\0")):
+            info, path = entry.split("\t", 1)
+            indexed[path] = info.split(" ", 1)[0]
+        return {p: indexed.get(p, "100644") for p in paths}
+
+    def commit(
+        self,
+        repo: Repo,
+        changes: ChangeSet,
+        message: str,
+        author: str,
+        sparse=False,
+    ) -> Optional[str]:
+        """Commit the paths in ``changes`` without reading the rest of the tree
+
+        The tree is built in a scratch index seeded from HEAD: changed files are
+        hashed straight into the object store, deleted ones dropped, and the
+        commit is written with ``commit-tree``. The real index is then updated
+        for the changed paths only. Return the new commit, None if the tree is
+        the same as HEAD's.
+        """
+        match = AUTHOR.fullmatch(author)
+        if match is None:
+            raise ValueError(f"invalid author {author!r}, expected 'Name <email>'")
+        name, email = match.groups()
+        changed = changes.paths(CREATED, MODIFIED)
+        deleted = changes.paths(DELETED)
+        with self.timed("commit"), tempfile.TemporaryDirectory() as tmp:
+            env = dict(GIT_INDEX_FILE=str(Path(tmp) / "index"))
+            parent = ["-p", "HEAD"] if repo.head.is_valid() else []
+            if parent:
+                repo.git.read_tree("HEAD", env=env)
+
+            paths = Path(tmp) / "paths"
+            paths.write_text("".join(f"{p}\n" for p in changed), encoding="utf-8")
+            with paths.open("rb") as f:
+                shas = repo.git.hash_object("-w", "--stdin-paths", istream=f).split()
+            modes = self.file_modes(repo, changed, env)
+            info = Path(tmp) / "index-info"
+            info.write_bytes(
+                b"".join(
+                    f"{modes[p]} {sha}\t{p}\0".encode("utf-8")
+                    for sha, p in zip(shas, changed)
+                )
+                + b"".join(f"0 {'0' * 40}\t{p}\0".encode("utf-8") for p in deleted)
+            )
+            with info.open("rb") as f:
+                repo.git.update_index("-z", "--index-info", istream=f, env=env)
+            tree = repo.git.write_tree(env=env)
+            if parent and tree == repo.git.rev_parse("HEAD^{tree}"):
+                return None
+
+            env = dict(GIT_AUTHOR_NAME=name, GIT_AUTHOR_EMAIL=email)
+            commit = repo.git.commit_tree(tree, *parent, "-m", message, env=env)
+            repo.git.update_ref("-m", f"commit: {message}", "HEAD", commit)
+
+            if sparse:
+                # only the few checked out entries are refreshed
+                repo.git.reset("-q")
+            else:
+                with info.open("rb") as f:
+                    repo.git.update_index("-z", "--index-info", istream=f)
+        logger.info(
+            f"Committed {commit[:7]}: {len(changed)} changed, {len(deleted)} deleted"
+        )
+        return commit
+
+    def push(self, repo: Repo):
+        with self.timed("push"):
+            repo.remote().push()
@@ -0,0 +1,53 @@
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional
+
+KINDS = ["stc", "catchdata", "bundle"]
+
+
+class Selection:
+    """Which stc tables, catchdata tables and asset bundles a run extracts
+
+    Built from selectors like ``stc:mission,gun``, ``catchdata:*`` or
+    ``bundle:asset_texttable``, each a kind followed by comma separated glob
+    patterns. Stc tables match by file id or mapped name, bundles with or
+    without their ``asset_`` prefix. Kinds without a selector match nothing.
+    """
+
+    def __init__(self, selectors: Iterable[str] = ()):
+        self.patterns: Dict[str, List[str]] = {kind: [] for kind in KINDS}
+        for selector in selectors:
+            kind, sep, patterns = selector.partition(":")
+            if not sep or kind not in self.patterns:
+                raise ValueError(
+                    f"invalid selector {selector!r}, expected one of "
+                    f"{', '.join(k + ':PATTERNS' for k in KINDS)}"
+                )
+            self.patterns[kind] += [p for p in patterns.split(",") if p]
+
+    def __bool__(self):
+        return any(self.patterns.values())
+
+    def __repr__(self):
+        return " ".join(f"{k}:{','.join(v)}" for k, v in self.patterns.items() if v)
+
+    def match(self, kind: str, *names: Optional[str]) -> bool:
+        return any(
+            fnmatchcase(name, pattern)
+            for pattern in self.patterns[kind]
+            for name in names
+            if name is not None
+        )
+
+    def stc(self, table_id: str, name: Optional[str] = None) -> bool:
+        return self.match("stc", table_id, name)
+
+    def catchdata(self, key: str) -> bool:
+        return self.match("catchdata", key)
+
+    def bundle(self, name: str) -> bool:
+        return self.match("bundle", name, name.removeprefix("asset_"))
+
+    @property
+    def needs_stc_data(self) -> bool:
+        """Whether the stc archive is needed, it also holds catchdata.dat"""
+        return bool(self.patterns["stc"] or self.patterns["catchdata"])
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class Snapshot:
+    """Raw inputs of a run keyed by the url they were fetched from
+
+    A capture stores every response body the run reads, repo files, the
+    version index, resdata, bundles and stc data, under ``files/`` with a
+    ``manifest.json`` mapping each url to its file and response validators.
+    A replay serves them back in place of the network, so the same run can be
+    repeated offline and with identical inputs.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self.manifest_path = self.root / "manifest.json"
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def entry(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        name = url.split("?", 1)[0].rsplit("/", 1)[-1]
+        return self.root / "files" / f"{digest}-{name}"
+
+    def lookup(self, url: str) -> Path:
+        if url not in self.manifest:
+            raise FileNotFoundError(f"{url} not in snapshot {self.root}")
+        return self.root / self.manifest[url]["file"]
+
+    def read(self, url: str) -> bytes:
+        return self.lookup(url).read_bytes()
+
+    def fetch(self, url: str, dst) -> int:
+        """Place the body of ``url`` at ``dst``, return its size"""
+        src = self.lookup(url)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(src, dst)
+        return os.path.getsize(dst)
+
+    def validators(self, url: str) -> dict:
+        return dict(self.manifest.get(url, {}).get("validators") or {})
+
+    def store(self, url: str, src, validators: Optional[dict] = None):
+        dst = self.entry(url)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if os.path.abspath(src) != os.path.abspath(dst):
+            shutil.copyfile(src, dst)
+        self.add(url, dst, validators)
+
+    def write(self, url: str, data: bytes, validators: Optional[dict] = None):
+        dst = self.entry(url)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.write_bytes(data)
+        self.add(url, dst, validators)
+
+    def add(self, url: str, path: Path, validators: Optional[dict]):
+        with self.lock:
+            entry: dict = dict(file=path.relative_to(self.root).as_posix())
+            # keep validators seen earlier, cache hits do not report any
+            validators = validators or self.validators(url)
+            if validators:
+                entry["validators"] = validators
+            self.manifest[url] = entry
+            tmp = self.manifest_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+            os.replace(tmp, self.manifest_path)
@@ -0,0 +1,148 @@
+import cProfile
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from logger_tt import logger
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+STAGES = [
+    "resdata",
+    "download",
+    "unpack_assets",
+    "process_stc",
+    "process_catchdata",
+    "format_hjson",
+    "commit_repo",
+]
+
+
+def cpu_time() -> float:
+    """User and system time of this process and its waited-for children
+
+    Pool workers are counted once the pool has shut down. Threads share the
+    process, so regions run concurrently see each other's CPU time.
+    """
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def peak_rss(who=None) -> Optional[int]:
+    """Peak resident set size in bytes since the process started
+
+    A high-water mark of the whole process, or of its largest waited-for child
+    if ``who`` says so, that never goes down again between stages.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    return rss if sys.platform == "darwin" else rss << 10
+
+
+class StageStats:
+    """Wall and CPU time, I/O counts and peak memory of the stages of a run
+
+    ``counters`` returns running totals such as bytes downloaded or files
+    written, each stage is credited with how much they grew while it ran.
+    Repeated stages are summed up and nested ones count towards both. Memory
+    is the peak of the process so far when the stage ended, shared by every
+    region it runs, not the memory used by the stage itself. Stages
+    named in ``profile`` run under cProfile, their stats are dumped to
+    ``{profile_dir}/{label}-{stage}.prof``.
+    """
+
+    def __init__(
+        self,
+        label: str = "",
+        counters: Optional[Callable[[], Dict[str, int]]] = None,
+        profile: Iterable[str] = (),
+        profile_dir=".",
+    ):
+        self.label = label
+        self.counters = counters or dict
+        self.profile = set(profile)
+        self.profile_dir = Path(profile_dir)
+        self.stages: Dict[str, dict] = {}
+        self.profiling = False
+
+    @contextmanager
+    def measure(self, name: str):
+        profiler = self.start_profile(name)
+        before = self.counters()
+        t0, c0 = time.perf_counter(), cpu_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, cpu_time() - c0
+            if profiler is not None:
+                self.stop_profile(name, profiler)
+            stage = self.stages.setdefault(name, dict(calls=0, wall=0.0, cpu=0.0))
+            stage["calls"] += 1
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+            for key, value in self.counters().items():
+                stage[key] = stage.get(key, 0) + value - before.get(key, 0)
+            if resource is not None:
+                stage["process_peak_rss"] = peak_rss()
+                stage["children_peak_rss"] = peak_rss(resource.RUSAGE_CHILDREN)
+            logger.info(f"{name} took {wall:.2f}s, cpu {cpu:.2f}s")
+
+    def start_profile(self, name: str) -> Optional[cProfile.Profile]:
+        if name not in self.profile or self.profiling:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # another thread is profiling its region
+            logger.warning(f"Not profiling {name}: {e}")
+            return None
+        self.profiling = True
+        return profiler
+
+    def stop_profile(self, name: str, profiler: cProfile.Profile):
+        profiler.disable()
+        self.profiling = False
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"{self.label}-{name}.prof"
+        profiler.dump_stats(path)
+        logger.info(f"Profile of {name} written to {path}")
+
+    def report(self) -> Dict[str, dict]:
+        return {name: dict(stage) for name, stage in self.stages.items()}
+
+    def summary(self) -> List[str]:
+        lines = []
+        for name, stage in self.stages.items():
+            line = f"{name}: {stage['wall']:.1f}s wall, {stage['cpu']:.1f}s cpu"
+            for key, value in stage.items():
+                if key.endswith("bytes") and value:
+                    line += f", {key} {value / 2**20:.1f} MiB"
+                elif key.endswith("files") and value:
+                    line += f", {key} {value}"
+            if stage.get("process_peak_rss"):
+                peak = stage["process_peak_rss"] / 2**20
+                line += f", process peak rss so far {peak:.0f} MiB"
+            lines.append(line)
+        return lines
+
+
+def stage(name: str):
+    """Measure a method of an object with a ``stages`` attribute as ``name``"""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.stages.measure(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
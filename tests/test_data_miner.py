@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from dataminer import data_miner
+from dataminer.data_miner import ASSET_MANIFEST, DataMiner
+from dataminer.registry import load_text_table
+from utils.asset_extractor import route
+from utils.outputs import write_if_changed
+
+# every stubbed load sleeps this long, regions must overlap them
+DELAY = 0.5
+
+
+def in_threads(*funcs) -> float:
+    """Run ``funcs`` in threads of their own, return the seconds taken"""
+    threads = [threading.Thread(target=func) for func in funcs]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - t0
+
+
+def make_miners(tmp_path: Path):
+    return [DataMiner(region=r, data_dir=tmp_path / r) for r in ("ch", "tw")]
+
+
+def test_metadata_loads_concurrently(tmp_path, monkeypatch):
+    calls = []
+
+    def read_repo_file(name):
+        calls.append(name)
+        time.sleep(DELAY)
+        return json.dumps({"game_host": "http://game"})
+
+    miners = make_miners(tmp_path)
+    for miner in miners:
+        monkeypatch.setattr(miner, "read_repo_file", read_repo_file)
+    elapsed = in_threads(*(lambda m=m: m.host_server for m in miners))
+    assert elapsed < 2 * DELAY
+    assert [m.host_server for m in miners] == ["http://game"] * 2
+    assert calls == ["hosts.json5"] * 2
+
+
+def test_metadata_prefetches_concurrently(tmp_path, monkeypatch):
+    def read_repo_file(name):
+        time.sleep(DELAY)
+        if name == "hosts.json5":
+            return json.dumps({"game_host": "http://game"})
+        return json.dumps({"data_version": "old"})
+
+    def http_get(url):
+        time.sleep(DELAY)
+        return json.dumps({"data_version": "new", "ab_version": "1"}).encode()
+
+    miners = make_miners(tmp_path)
+    for miner in miners:
+        monkeypatch.setattr(miner, "read_repo_file", read_repo_file)
+        monkeypatch.setattr(miner, "http_get", http_get)
+    # hosts then the version index, with version.json read alongside
+    elapsed = in_threads(*(m.prefetch_metadata for m in miners))
+    assert elapsed < 3 * DELAY
+    assert all(m.index_version["data_version"] == "new" for m in miners)
+    assert all(m.local_version["data_version"] == "old" for m in miners)
+
+
+def test_resdata_loads_concurrently(tmp_path, monkeypatch):
+    lists = ["passivityAssetBundles", "BaseAssetBundles", "AddAssetBundles"]
+
+    def download(targets, revalidate=False):
+        time.sleep(DELAY)
+
+    def unpack_all_assets(file, destination_folder):
+        asset = Path(destination_folder, "assets/resources/resdata.asset")
+        asset.parent.mkdir(parents=True, exist_ok=True)
+        asset.write_text(json.dumps(dict.fromkeys(lists, [])), encoding="utf-8")
+
+    monkeypatch.setattr(data_miner, "unpack_all_assets", unpack_all_assets)
+    miners = make_miners(tmp_path)
+    for miner in miners:
+        miner.memo("resdata_url", lambda: "http://cdn/resdata")
+        monkeypatch.setattr(miner, "download", download)
+    elapsed = in_threads(*(lambda m=m: m.resdata for m in miners))
+    assert elapsed < 2 * DELAY
+    assert all(m.resdata == dict.fromkeys(lists, []) for m in miners)
+
+
+def test_repos_open_concurrently(tmp_path, monkeypatch):
+    from git.repo import Repo
+
+    def clone(miner):
+        time.sleep(DELAY)
+        return Repo.init(miner.data_dir)
+
+    miners = make_miners(tmp_path)
+    for miner in miners:
+        monkeypatch.setattr(miner, "clone_repo", lambda m=miner: clone(m))
+    elapsed = in_threads(*(lambda m=m: m.repo for m in miners))
+    assert elapsed < 2 * DELAY
+    assert [Path(m.repo.working_tree_dir) for m in miners] == [
+        tmp_path / "ch",
+        tmp_path / "tw",
+    ]
+
+
+def write_json(path: Path, obj):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj), encoding="utf-8")
+
+
+def test_incremental_sweeps_files_of_changed_bundles(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    old = {
+        "asset/top.txt": "top",
+        "asset/table/a.txt": "a1",
+        "asset/table/b.txt": "b",
+        "asset/avgtxt/x.txt": "x",
+    }
+    for key, text in old.items():
+        (data / key).parent.mkdir(parents=True, exist_ok=True)
+        (data / key).write_text(text)
+    manifest = {
+        # asset/table is shared with another bundle, top.txt has no subtree
+        "asset_texttable": ["asset/avgtxt/x.txt", "asset/table/a.txt", "asset/top.txt"],
+        "asset_textes": ["asset/table/b.txt"],
+    }
+    write_json(data / ASSET_MANIFEST, manifest)
+    write_json(data / "version.json", {"data_version": "d1"})
+
+    def resdata(texttable):
+        bundles = [("asset_textes", "e1"), ("asset_texttable", texttable)]
+        return {
+            "resUrl": "http://cdn/",
+            "BaseAssetBundles": [
+                {"assetBundleName": name, "resname": res} for name, res in bundles
+            ],
+        }
+
+    write_json(data / "resdata_no_hash.json", resdata("t1"))
+    contents = {"asset_texttable": {"assets/resources/dabao/table/a.txt": "a2"}}
+
+    def download(targets, revalidate=False):
+        for _, path in targets:
+            write_json(Path(path), contents[Path(path).stem])
+
+    def unpack_bundle_timed(file, destination_folder, routes, **kwargs):
+        written = []
+        for path, text in json.loads(Path(file).read_text()).items():
+            dest = route(path, destination_folder, routes)
+            written.append((path, dest, write_if_changed(dest, text.encode())))
+        return written, 0.0
+
+    formatted = []
+    monkeypatch.setattr(data_miner, "unpack_bundle_timed", unpack_bundle_timed)
+    miner = DataMiner(data_dir=data, workers=1)
+    miner.memo("index_version", lambda: {"data_version": "d1"})
+    miner.memo("resdata", lambda: resdata("t2"))
+    monkeypatch.setattr(miner, "download", download)
+    monkeypatch.setattr(miner, "format_hjson", lambda: formatted.append(True))
+    miner.extract_incremental()
+
+    files = {p.relative_to(data).as_posix() for p in data.rglob("*") if p.is_file()}
+    assert files - {ASSET_MANIFEST, "version.json", "resdata_no_hash.json"} == {
+        "asset/table/a.txt",
+        "asset/table/b.txt",
+    }
+    assert (data / "asset/table/a.txt").read_text() == "a2"
+    assert not (data / "asset/avgtxt").exists()
+    assert json.loads((data / ASSET_MANIFEST).read_text()) == dict(
+        manifest, asset_texttable=["asset/table/a.txt"]
+    )
+    assert miner.changes.paths() == [
+        "asset/avgtxt/x.txt",
+        "asset/table/a.txt",
+        "asset/top.txt",
+        ASSET_MANIFEST,
+    ]
+    assert formatted
+
+
+def test_text_table_requires_directory(tmp_path):
+    (tmp_path / "table").mkdir()
+    (tmp_path / "table/a.txt").write_text("k1,one\nk2,two\n", encoding="utf-8")
+    assert load_text_table(tmp_path / "table") == {"k1": "one", "k2": "two"}
+    with pytest.raises(FileNotFoundError):
+        load_text_table(tmp_path / "missing")
+
+
+def test_selected_stc_skips_resdata(tmp_path, monkeypatch):
+    def resdata(self):
+        raise AssertionError("resdata loaded without selected bundles")
+
+    monkeypatch.setattr(DataMiner, "resdata", property(resdata))
+    miner = DataMiner(data_dir=tmp_path, select=["stc:gun"])
+    miner.memo("index_version", lambda: {"data_version": "d1"})
+    miner.memo("hosts", lambda: {"cdn_host": "http://cdn"})
+    downloaded = []
+    monkeypatch.setattr(miner, "download", downloaded.extend)
+    monkeypatch.setattr(miner, "extract_stc", lambda: None)
+    monkeypatch.setattr(miner, "process_stc", lambda: None)
+    miner.extract_selected()
+    assert [url for url, _ in downloaded] == [miner.stc_target()[0]]
@@ -0,0 +1,120 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.download import DownloadManager, PermanentDownloadError
+
+DATA = bytes(range(256)) * 40
+ETAG = '"v1"'
+LAST_MODIFIED = "Sat, 01 Aug 2026 00:00:00 GMT"
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.requests = []  # (path, Range header) of every GET
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        assert isinstance(self.server, Server)
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        if self.path == "/redirect":
+            self.reply(302, {"Location": "/file"})
+        elif self.path == "/file":
+            self.send_file()
+        else:
+            self.reply(404)
+
+    def reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self):
+        validators = {"ETag": ETAG, "Last-Modified": LAST_MODIFIED}
+        ranged = self.headers.get("Range")
+        if ranged is None:
+            return self.reply(200, validators, DATA)
+        start = int(ranged.removeprefix("bytes=").rstrip("-"))
+        if start >= len(DATA):
+            return self.reply(416, {"Content-Range": f"bytes */{len(DATA)}"})
+        validators["Content-Range"] = f"bytes {start}-{len(DATA) - 1}/{len(DATA)}"
+        self.reply(206, validators, DATA[start:])
+
+
+@pytest.fixture
+def server():
+    httpd = Server()
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def manager():
+    with DownloadManager(max_workers=2, retries=3, backoff=0.01) as manager:
+        yield manager
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_resumes_partial_transfer(server, manager, tmp_path):
+    path = tmp_path / "file.bin"
+    (tmp_path / "file.bin.tmp").write_bytes(DATA[:1000])
+    stats = manager.download(url(server, "/file"), str(path))
+    assert path.read_bytes() == DATA
+    assert server.requests == [("/file", "bytes=1000-")]
+    assert (stats.resumed_from, stats.size) == (1000, len(DATA) - 1000)
+    assert stats.validators["Content-Length"] == str(len(DATA))
+
+
+def test_416_restarts_from_zero(server, manager, tmp_path):
+    path = tmp_path / "file.bin"
+    (tmp_path / "file.bin.tmp").write_bytes(bytes(len(DATA) + 10))
+    stats = manager.download(url(server, "/file"), str(path))
+    assert path.read_bytes() == DATA
+    assert server.requests == [("/file", f"bytes={len(DATA) + 10}-"), ("/file", None)]
+    assert (stats.attempts, stats.resumed_from, stats.size) == (2, 0, len(DATA))
+
+
+def test_follows_redirects(server, manager, tmp_path):
+    path = tmp_path / "file.bin"
+    manager.download_all([(url(server, "/redirect"), str(path))])
+    assert path.read_bytes() == DATA
+    assert [p for p, _ in server.requests] == ["/redirect", "/file"]
+
+
+def test_not_found_is_not_retried(server, manager, tmp_path):
+    path = tmp_path / "missing.bin"
+    with pytest.raises(PermanentDownloadError):
+        manager.download(url(server, "/missing"), str(path))
+    assert server.requests == [("/missing", None)]
+    assert not path.exists()
+
+
+def test_returns_validators(server, manager, tmp_path):
+    path = tmp_path / "file.bin"
+    stats = manager.download(url(server, "/file"), str(path))
+    assert stats.validators == {
+        "ETag": ETAG,
+        "Last-Modified": LAST_MODIFIED,
+        "Content-Length": str(len(DATA)),
+    }
+    assert not stats.skipped
+    assert manager.download(url(server, "/file"), str(path)).skipped
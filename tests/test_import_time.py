@@ -0,0 +1,40 @@
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# only imported by the stages that need them, never by the cli itself
+HEAVY = ["git", "UnityPy", "urllib3", "gf_utils2", "pandas", "PIL"]
+IMPORTTIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+# generous next to the ~150 ms measured locally, CI machines vary
+BUDGET_MS = 500
+
+
+def run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    )
+
+
+@pytest.mark.parametrize("module", ["dataminer.data_miner", "dataminer.cli"])
+def test_no_heavy_imports(module):
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    loaded = {name.split(".")[0] for name in run(code).stdout.split()}
+    assert not loaded & set(HEAVY), f"{module} imports {sorted(loaded & set(HEAVY))}"
+
+
+def test_cli_import_budget():
+    # best of several runs, the first one may pay for cold file caches
+    best = float("inf")
+    for _ in range(3):
+        for line in run("import dataminer.cli").stderr.splitlines():
+            match = IMPORTTIME.match(line)
+            if match and match[2] == "dataminer.cli":
+                best = min(best, int(match[1]) / 1000)
+    assert best <= BUDGET_MS, f"import dataminer.cli took {best:.0f} ms"
@@ -0,0 +1,65 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_catchdata_tables, make_stc, random_type_ids
+from utils import json_writer
+from utils.format_stc import format_stc
+
+MAPPING_DIR = Path(__file__).parents[1] / "dataminer/stc-mapping"
+MAPPINGS = sorted((MAPPING_DIR / "3081").glob("*.json"))
+
+EDGE_CASES = [
+    {"exp": [1e16, 1e-05, 1e-07, -2.5e-300, 1.5e300, 5e-324, 0.0001, 1e15]},
+    {"zero": [0.0, -0.0, 1.0, -1.0]},
+    {"nonfinite": [float("nan"), float("inf"), None]},
+    {"int": [2**63, -(2**63), 2**64, -(2**64) - 1]},
+    {"str": ["\x00\x1f\x7f\u2028", '"\\/\b\f\n\r\t', "人形 1e-7,"]},
+    {"key 1e-7": 1e-7, "": {}, "list": [[], [{}], [[1e-7]]]},
+    {1: "int key", 1.5: "float key", True: "bool key", None: "none key"},
+    {"deep": [[[[[[{"a": [1e-7, "  x"]}]]]]]]},
+    [],
+    {},
+    "scalar",
+    1e-07,
+]
+
+
+def expected(obj, indent):
+    return json.dumps(obj, indent=indent, ensure_ascii=False).encode("utf-8")
+
+
+def check(obj):
+    for indent in (2, 4):
+        assert json_writer.dumps(obj, indent) == expected(obj, indent)
+        if json_writer.orjson is not None:
+            out = json_writer.dumps_orjson(obj, indent)
+            assert out is None or out == expected(obj, indent)
+
+
+@pytest.mark.parametrize("obj", EDGE_CASES)
+def test_edge_cases(obj):
+    check(obj)
+
+
+@pytest.mark.parametrize("mapping", MAPPINGS, ids=lambda p: p.stem)
+def test_stc_tables(mapping: Path, tmp_path: Path):
+    ncol = len(json.loads(mapping.read_text())["fields"])
+    stc = tmp_path / f"{mapping.stem}.stc"
+    seed = int(mapping.stem)
+    stc.write_bytes(make_stc(random_type_ids(ncol, seed=seed), 50, True, seed=seed))
+    check(format_stc(str(stc), mapping, True)[1])
+
+
+def test_catchdata_tables():
+    for _, table in make_catchdata_tables(20, 50, random.Random(0)):
+        check(table)
+
+
+def test_orjson_used_for_tables():
+    orjson = pytest.importorskip("orjson")
+    assert json_writer.orjson is orjson
+    table = [{"id": i, "rate": i / 7, "name": f"人形 {i}"} for i in range(100)]
+    assert json_writer.dumps_orjson(table) == expected(table, 4)
@@ -0,0 +1,171 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+from git.repo import Repo
+
+from dataminer.repo import SPARSE_TOP_LEVEL, RepoManager
+from utils.outputs import CREATED, DELETED, MODIFIED, ChangeSet
+
+AUTHOR = "Data Bot <bot@example.com>"
+FILES = {
+    "version.json": "1",
+    "keep.json": "k",
+    "gone.json": "g",
+    "stc/gun.json": "gun",
+    "stc/old.json": "old",
+}
+
+
+def git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def write(root: Path, files: dict):
+    for key, text in files.items():
+        (root / key).parent.mkdir(parents=True, exist_ok=True)
+        (root / key).write_text(text, encoding="utf-8")
+
+
+@pytest.fixture(autouse=True)
+def identity(monkeypatch, tmp_path):
+    # commit-tree needs a committer, keep the user's git config out of it
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "test@example.com")
+
+
+@pytest.fixture
+def remote(tmp_path) -> str:
+    """file:// url of a bare repo holding one commit of ``FILES``"""
+    seed = tmp_path / "seed"
+    seed.mkdir()
+    git(seed, "init", "-q", "-b", "main")
+    write(seed, FILES)
+    git(seed, "add", "-A")
+    git(seed, "commit", "-q", "-m", "seed")
+    git(tmp_path, "clone", "-q", "--bare", str(seed), "remote.git")
+    return (tmp_path / "remote.git").as_uri()
+
+
+def push_file(tmp_path: Path, url: str, key: str, text: str):
+    work = tmp_path / "push"
+    git(tmp_path, "clone", "-q", url, str(work))
+    write(work, {key: text})
+    git(work, "add", "-A")
+    git(work, "commit", "-q", "-m", f"add {key}")
+    git(work, "push", "-q")
+
+
+def edit(root: Path) -> ChangeSet:
+    """Modify, create and delete files, recorded in a ``ChangeSet``"""
+    changes = ChangeSet(root, tracked=filter(None, git(root, "ls-files").split()))
+    changes.write(root / "version.json", b"2")
+    changes.write(root / "stc/gun.json", b"gun2")
+    changes.write(root / "stc/new/doll.json", b"doll")
+    changes.delete(root / "gone.json")
+    changes.delete(root / "stc/old.json")
+    return changes
+
+
+def add_all_tree(tmp_path: Path, url: str) -> str:
+    """Tree ``git add -A`` records for the same edits"""
+    work = tmp_path / "add_all"
+    git(tmp_path, "clone", "-q", url, str(work))
+    edit(work)
+    git(work, "add", "-A")
+    return git(work, "write-tree")
+
+
+def test_checkout_through_mirror_then_fetch(tmp_path, remote):
+    manager = RepoManager(cache_dir=tmp_path / "cache")
+    repo = manager.checkout(remote, "data", tmp_path / "a")
+    assert (tmp_path / "a/stc/gun.json").read_text() == "gun"
+    assert repo.remote().url == remote
+    mirror = tmp_path / "cache/data.git"
+    assert git(mirror, "remote") == ""
+    assert "fetch" not in manager.timings
+
+    push_file(tmp_path, remote, "added.json", "new")
+    manager.checkout(remote, "data", tmp_path / "b")
+    assert (tmp_path / "b/added.json").read_text() == "new"
+    assert "fetch" in manager.timings
+    pushed = git(tmp_path / "remote.git", "rev-parse", "main")
+    assert git(mirror, "rev-parse", "main") == pushed
+
+
+def test_commit_matches_add_all(tmp_path, remote):
+    manager = RepoManager()
+    repo = manager.checkout(remote, "data", tmp_path / "work")
+    head = repo.head.commit.hexsha
+    changes = edit(tmp_path / "work")
+    assert changes.paths(DELETED) == ["gone.json", "stc/old.json"]
+
+    commit = manager.commit(repo, changes, "update", AUTHOR)
+    assert commit == repo.head.commit.hexsha
+    assert repo.head.commit.parents[0].hexsha == head
+    assert repo.head.commit.author.email == "bot@example.com"
+    assert repo.head.commit.tree.hexsha == add_all_tree(tmp_path, remote)
+    # the index follows the commit, nothing is left staged or unstaged
+    assert git(tmp_path / "work", "status", "--porcelain") == ""
+
+
+def test_commit_keeps_exec_bit(tmp_path, remote):
+    manager = RepoManager()
+    root = tmp_path / "work"
+    repo = manager.checkout(remote, "data", root)
+    changes = ChangeSet(root)
+    changes.write(root / "run.sh", b"#!/bin/sh\n")
+    os.chmod(root / "run.sh", 0o755)
+    manager.commit(repo, changes, "script", AUTHOR)
+    assert git(root, "ls-tree", "HEAD", "run.sh").startswith("100755")
+
+    # without core.fileMode the mode in the index is kept
+    repo.git.config("core.filemode", "false")
+    changes = ChangeSet(root)
+    changes.write(root / "run.sh", b"#!/bin/sh\necho\n")
+    os.chmod(root / "run.sh", 0o644)
+    manager.commit(repo, changes, "edit script", AUTHOR)
+    assert git(root, "ls-tree", "HEAD", "run.sh").startswith("100755")
+
+
+def test_unchanged_tree_commits_nothing(tmp_path, remote):
+    manager = RepoManager()
+    repo = manager.checkout(remote, "data", tmp_path / "work")
+    head = repo.head.commit.hexsha
+    changes = ChangeSet(tmp_path / "work")
+    changes.record(tmp_path / "work/keep.json", MODIFIED)
+    assert manager.commit(repo, changes, "noop", AUTHOR) is None
+    assert repo.head.commit.hexsha == head
+
+
+def test_first_commit_has_no_parent(tmp_path):
+    root = tmp_path / "new"
+    repo = Repo.init(root)
+    changes = ChangeSet(root)
+    for key, text in FILES.items():
+        changes.write(root / key, text.encode())
+    commit = RepoManager().commit(repo, changes, "init", AUTHOR)
+    assert commit == repo.head.commit.hexsha
+    assert repo.head.commit.parents == ()
+    assert changes.paths(CREATED) == sorted(FILES)
+    git(root, "add", "-A")
+    assert repo.head.commit.tree.hexsha == git(root, "write-tree")
+
+
+def test_sparse_checkout_and_commit(tmp_path, remote):
+    manager = RepoManager()
+    root = tmp_path / "work"
+    repo = manager.checkout(remote, "data", root, sparse=SPARSE_TOP_LEVEL)
+    assert (root / "version.json").exists()
+    assert not (root / "stc").exists()
+
+    commit = manager.commit(repo, edit(root), "update", AUTHOR, sparse=True)
+    assert commit == repo.head.commit.hexsha
+    assert repo.head.commit.tree.hexsha == add_all_tree(tmp_path, remote)
+    assert git(root, "status", "--porcelain") == ""
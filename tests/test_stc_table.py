@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.synthetic import make_stc
+from utils.format_stc import StcTable
+
+ROWS = 50
+
+
+@pytest.fixture(params=[[5, 1, 8, 9, 5], [5, 11, 9, 11, 1]], ids=["fixed", "strings"])
+def table(request, tmp_path):
+    path = tmp_path / "5000.stc"
+    path.write_bytes(make_stc(request.param, ROWS, seed=1))
+    with StcTable(str(path)) as table:
+        yield table
+
+
+def test_random_access_matches_iteration(table):
+    rows = list(table)
+    assert len(rows) == len(table) == ROWS
+    for i in [37, 3, 49, 0, 12, 37]:
+        assert table[i] == rows[i]
+        assert table.values(i) == list(rows[i].values())
+        for key in table.fields:
+            assert table.cell(i, key) == rows[i][key]
+    assert table[5:40:7] == rows[5:40:7]
+    assert table[-3:] == rows[-3:]
+    for key in table.fields:
+        assert table.column(key) == [row[key] for row in rows]
+
+
+def test_negative_indexes_count_from_the_end(table):
+    rows = list(table)
+    for i in [-1, -2, -ROWS]:
+        assert table[i] == rows[i]
+        assert table.row_offset(i) == table.row_offset(ROWS + i)
+        assert table.cell(i, "unk_1") == rows[i]["unk_1"]
+
+
+@pytest.mark.parametrize("index", [ROWS, ROWS + 10, -ROWS - 1])
+def test_out_of_range_raises_index_error(table, index):
+    with pytest.raises(IndexError):
+        table[index]
+    with pytest.raises(IndexError):
+        table.cell(index, "unk_0")
+    with pytest.raises(IndexError):
+        table.row_offset(index)
+
+
+def test_get_by_primary_key(table):
+    rows = list(table)
+    first = {}
+    for row in rows:
+        first.setdefault(row["unk_0"], row)
+    for key, row in first.items():
+        assert table.get(key) == row
+    assert table.get(object(), "missing") == "missing"
@@ -1,17 +1,61 @@
-import json
 import logging
 import os
+import re
 import sys
+import time
+from fnmatch import fnmatch
 
-import UnityPy
+from utils import json_writer
+from utils.crypto import xor_decrypt
+from utils.outputs import write_if_changed
 
 
-def unpack_all_assets(file: str, destination_folder: str):
+ASSET_TYPES = ("TextAsset", "MonoBehaviour")
+
+
+def route(path: str, destination_folder: str, routes=None):
+    """Destination of container ``path``, None if no route matches it"""
+    if routes is None:
+        return os.path.join(destination_folder, *path.split("/"))
+    for prefix, dst in routes.items():
+        if path.startswith(prefix + "/"):
+            return os.path.join(dst, *path[len(prefix) + 1 :].split("/"))
+    return None
+
+
+def unpack_all_assets(
+    file: str,
+    destination_folder: str,
+    types=ASSET_TYPES,
+    exclude=(),
+    routes=None,
+    decrypt=None,
+):
+    """Unpack text assets of ``file``
+
+    Return ``(container path, destination, status)`` for every file, see
+    ``utils.outputs.write_if_changed`` for ``status``.
+
+    Entries whose type is not in ``types``, whose container path matches one
+    of the ``exclude`` fnmatch patterns or, when ``routes`` maps container
+    path prefixes to output directories, that fall under no route are skipped
+    before being deserialized. ``.txt`` entries under a prefix of ``decrypt``
+    are XOR-decrypted with its key and written without the extension. Files
+    already holding the same content are not rewritten.
+    """
     file = str(file)
     destination_folder = str(destination_folder)
     logging.debug(f"unpacking {file}")
+    import UnityPy
+
     env = UnityPy.load(file)
+    written = []
     for path, obj in env.container.items():
+        if obj.type.name not in types or any(fnmatch(path, p) for p in exclude):
+            continue
+        dest = route(path, destination_folder, routes)
+        if dest is None:
+            continue
         data = obj.read()
         out = None
         logging.debug(f"unpacking {obj.type.name} {path}")
@@ -19,17 +63,47 @@ def unpack_all_assets(file: str, destination_folder: str):
             out = data.script
         elif obj.type.name in ["MonoBehaviour"]:
             if obj.serialized_type.nodes:
-                out = json.dumps(
-                    obj.read_typetree(), indent=4, ensure_ascii=False
-                ).encode("utf8")
+                out = json_writer.dumps(obj.read_typetree())
             else:
                 out = data.raw_data
         else:
             continue
-        dest = os.path.join(destination_folder, *path.split("/"))
-        os.makedirs(os.path.dirname(dest), exist_ok=True)
-        with open(dest, "wb") as f:
-            f.write(bytes(out))
+        out = bytes(out)
+        for prefix, key in (decrypt or {}).items():
+            if path.startswith(prefix + "/") and path.endswith(".txt"):
+                logging.debug(f"decrypting {path}")
+                out = xor_decrypt(out, key)
+                dest = dest[:-4]
+        written.append((path, dest, write_if_changed(dest, out)))
+    return written
+
+
+def unpack_bundle_timed(file, destination_folder, **kwargs):
+    """``unpack_all_assets`` for worker pools, return ``(written, seconds)``"""
+    t0 = time.perf_counter()
+    written = unpack_all_assets(str(file), str(destination_folder), **kwargs)
+    return written, time.perf_counter() - t0
+
+
+def read_asset_field(file, name: str, field: str):
+    """Read one top level string ``field`` of the asset ``name`` in ``file``
+
+    Nothing is written to disk and other container entries are not read.
+    Returns None if the asset or field is missing.
+    """
+    import UnityPy
+
+    env = UnityPy.load(str(file))
+    for path, obj in env.container.items():
+        if path.rsplit("/", 1)[-1] != name:
+            continue
+        if obj.type.name == "MonoBehaviour" and obj.serialized_type.nodes:
+            return obj.read_typetree().get(field)
+        attr = "script" if obj.type.name == "TextAsset" else "raw_data"
+        text = bytes(getattr(obj.read(), attr))
+        match = re.search(rb'"?%s"?\s*:\s*"([^"]*)"' % re.escape(field.encode()), text)
+        return match[1].decode("utf-8") if match else None
+    return None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class ArtifactCache:
+    """On-disk cache of downloaded files keyed by their remote identity
+
+    Each entry is stored under the sha1 of its key next to a small json
+    sidecar holding the key and response validators. Entries are touched on
+    every hit and the least recently used ones are evicted once the cache
+    grows beyond ``max_bytes``.
+    """
+
+    def __init__(self, root, max_bytes=2 << 30):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def entry(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / digest
+
+    def meta(self, key: str) -> Optional[dict]:
+        try:
+            return json.loads(self.entry(key).with_suffix(".json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, key: str, dst) -> bool:
+        """Place the cached file for ``key`` at ``dst``, return whether it was hit"""
+        src = self.entry(key)
+        if not src.exists():
+            return False
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+        os.utime(src)
+        logging.debug(f"cache hit {key}")
+        return True
+
+    def store(self, key: str, src, meta: Optional[dict] = None):
+        dst = self.entry(key)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f"{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+        dst.with_suffix(".json").write_text(json.dumps(dict(meta or {}, key=key)))
+        logging.debug(f"cache store {key}")
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for f in self.root.glob("*/*"):
+                if f.suffix:
+                    continue
+                try:
+                    st = f.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, f))
+            total = sum(size for _, size, _ in entries)
+            for _, size, f in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                logging.debug(f"cache evict {f.name}")
+                f.unlink(missing_ok=True)
+                f.with_suffix(".json").unlink(missing_ok=True)
+                total -= size
@@ -0,0 +1,87 @@
+import json
+import re
+import zlib
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from utils.crypto import XorStream
+
+CHUNK_SIZE = 1 << 20
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# name of the table on a catchdata line, read without parsing the line
+TABLE_KEY = re.compile(rb'\s*\{\s*"([^"\\]*)"\s*:')
+
+
+def iter_gunzip(chunks: Iterator[bytes], chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+    """Incrementally gunzip ``chunks``, yielding at most ``chunk_size`` bytes at once
+
+    Concatenated members and zero padding after a member are accepted, as in
+    ``gzip.GzipFile``.
+    """
+    d = zlib.decompressobj(GZIP_WBITS)
+    started = False
+    for chunk in chunks:
+        started = True
+        while True:
+            if d.eof:
+                chunk = chunk.lstrip(b"\x00")
+                if not chunk:
+                    break
+                d = zlib.decompressobj(GZIP_WBITS)
+            plain = d.decompress(chunk, chunk_size)
+            if plain:
+                yield plain
+            chunk = d.unused_data if d.eof else d.unconsumed_tail
+            # a full output buffer may leave decoded data pending inside zlib
+            if not chunk and (d.eof or len(plain) < chunk_size):
+                break
+    if started and not d.eof:
+        raise EOFError(
+            "Compressed file ended before the end-of-stream marker was reached"
+        )
+
+
+def iter_lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Split ``chunks`` on ``b"\\n"``, a trailing unterminated line is dropped"""
+    pending = bytearray()
+    for data in chunks:
+        start = 0
+        while True:
+            nl = data.find(b"\n", start)
+            if nl < 0:
+                pending += data[start:]
+                break
+            if pending:
+                pending += data[start:nl]
+                line = bytes(pending)
+                pending.clear()
+            else:
+                line = data[start:nl]
+            yield line
+            start = nl + 1
+
+
+def iter_catchdata(
+    f: BinaryIO,
+    key: str,
+    chunk_size=CHUNK_SIZE,
+    select: Optional[Callable[[str], bool]] = None,
+) -> Iterator[Tuple[str, list]]:
+    """Decode an encrypted ``catchdata.dat`` stream into ``(name, table)`` pairs
+
+    Decryption, decompression and line splitting are chained chunk by chunk, so
+    only the table being parsed is held in memory as a whole. With ``select``
+    only tables whose name it accepts are yielded, the others are not parsed.
+    """
+    xor = XorStream(key)
+    cipher = iter(lambda: f.read(chunk_size), b"")
+    plain = iter_gunzip(map(xor.update, cipher), chunk_size)
+    for line in iter_lines(plain):
+        if select is not None:
+            match = TABLE_KEY.match(line)
+            if match and not select(match[1].decode("utf-8")):
+                continue
+        data = json.loads(line.decode("utf-8"))
+        assert len(data.keys()) == 1
+        for name, table in data.items():
+            if select is None or select(name):
+                yield name, table
@@ -13,11 +13,42 @@ def get_des_encrypted(data, key, iv):
     des = DES.new(key=key,iv=iv,mode=DES.MODE_CBC)
     return des.encrypt(pad(data.encode('utf-8'),block_size=des.block_size))
 
-def xor_decrypt(cipher,key):
-    key = key.encode('utf-8')
+def xor_tiled(data, key:bytes, phase=0):
+    """XOR ``data`` with ``key`` repeated from key offset ``phase``
+
+    The key is tiled to the data length and both are XORed as one big int,
+    which runs in C instead of one interpreter step per byte.
+    """
+    n = len(data)
+    if n == 0:
+        return b''
     lk = len(key)
-    plain = [c^key[i%lk] for i,c in enumerate(cipher)]
-    return bytes(plain)
+    phase %= lk
+    stream = key[phase:] + key[:phase]
+    stream = (stream * (n // lk + 1))[:n]
+    plain = int.from_bytes(data,'little') ^ int.from_bytes(stream,'little')
+    return plain.to_bytes(n,'little')
+
+def xor_decrypt(cipher,key):
+    if isinstance(key,str):
+        key = key.encode('utf-8')
+    return xor_tiled(cipher,key)
+
+class XorStream:
+    """Chunked ``xor_decrypt``, the key phase carries across ``update`` calls"""
+    def __init__(self,key):
+        self.key = key.encode('utf-8') if isinstance(key,str) else key
+        self.pos = 0
+
+    def update(self,chunk):
+        plain = xor_tiled(chunk,self.key,self.pos)
+        self.pos += len(chunk)
+        return plain
+
+def iter_xor_decrypt(chunks,key):
+    stream = XorStream(key)
+    for chunk in chunks:
+        yield stream.update(chunk)
 
 def decrypt_rc4(data, key):
     rc4 = ARC4.new(key)
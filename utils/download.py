@@ -1,31 +1,301 @@
-import os
-from urllib import request
-from urllib.error import URLError
+import http.client
 import logging
+import os
+import queue
+import random
+import re
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Optional
+from urllib.error import URLError
+from urllib.parse import urljoin, urlsplit
 
 socket.setdefaulttimeout(30)
 
-def download(url, path):
-    os.makedirs(os.path.split(path)[0],exist_ok=True)
-    for _ in range(10):
+REDIRECTS = {301, 302, 303, 307, 308}
+VALIDATORS = ["ETag", "Last-Modified", "Content-Length"]
+CONTENT_RANGE = re.compile(r"bytes (\d+)-\d*/?(\d*)")
+
+
+class DownloadError(URLError):
+    pass
+
+
+class PermanentDownloadError(DownloadError):
+    """The server refused the request in a way retrying does not change"""
+
+
+# client errors that may go away on their own, the others are final
+RETRYABLE = {408, 429}
+
+
+def validators(resp: http.client.HTTPResponse) -> dict:
+    return {k: v for k in VALIDATORS if (v := resp.getheader(k)) is not None}
+
+
+@dataclass
+class TransferStats:
+    url: str
+    path: str
+    size: int = 0  # bytes received in this run, resumed bytes excluded
+    resumed_from: int = 0
+    seconds: float = 0.0
+    attempts: int = 0
+    skipped: bool = False
+    cached: bool = False
+    validators: Optional[dict] = None  # ETag/Last-Modified/Content-Length
+
+    @property
+    def throughput(self):
+        """Received bytes per second"""
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.skipped:
+            return f"{self.path} skipped, already exists"
+        if self.cached:
+            return f"{self.path} from cache"
+        resumed = f", resumed at {self.resumed_from}" if self.resumed_from else ""
+        return (
+            f"{self.path} {self.size / 2**20:.2f} MiB in {self.seconds:.2f}s "
+            f"({self.throughput / 2**20:.2f} MiB/s, {self.attempts} attempt(s)"
+            f"{resumed})"
+        )
+
+
+class ConnectionPool:
+    """Keep-alive ``http.client`` connections, at most ``maxsize`` idle per host"""
+
+    def __init__(self, maxsize=4, timeout=30):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def get(self, scheme: str, netloc: str):
+        """Return ``(connection, reused)``, preferring an idle keep-alive one"""
+        with self.lock:
+            conns = self.idle.setdefault((scheme, netloc), queue.LifoQueue())
         try:
-            if not os.path.exists(path):
-                logging.debug(f'start downloading {url} to {path}')
-                request.urlretrieve(url,path+'.tmp')
-                os.rename(path+'.tmp',path)
-                logging.debug(f'successfully downloaded {path}')
-            else:
-                logging.warning(f'{path} already exists, skip downloading')
-        except Exception as e:
-            logging.warning(f'download {path} failed, retrying')
-            logging.warning(f'Exception: {e}')
-            continue
+            return conns.get_nowait(), True
+        except queue.Empty:
+            return self.connect(scheme, netloc), False
+
+    def put(self, scheme: str, netloc: str, conn: http.client.HTTPConnection):
+        conns = self.idle[(scheme, netloc)]
+        if conns.qsize() < self.maxsize:
+            conns.put(conn)
         else:
-            break
-    else:
-        raise URLError("Reached max retry time, download failed")
+            conn.close()
+
+    def request(self, method: str, url: str, headers=None, body=None):
+        """Send a request, return ``(response, release)``
+
+        ``release(reuse)`` must be called once the response is consumed, the
+        connection goes back to the pool only if ``reuse`` is set.
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn, reused = self.get(parts.scheme, parts.netloc)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if not reused:
+                raise
+            # the server may have dropped an idle keep-alive connection
+            conn = self.connect(parts.scheme, parts.netloc)
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+
+        def release(reuse=True):
+            if reuse and not resp.will_close:
+                self.put(parts.scheme, parts.netloc, conn)
+            else:
+                conn.close()
+
+        return resp, release
+
+    def close(self):
+        with self.lock:
+            for conns in self.idle.values():
+                while not conns.empty():
+                    conns.get_nowait().close()
+
+
+class DownloadManager:
+    """Concurrent downloader with connection reuse, resume and retry backoff
+
+    Partial transfers are kept as ``path + ".tmp"`` and resumed with an HTTP
+    Range request. Failed attempts are retried ``retries`` times, sleeping an
+    exponentially growing, jittered delay in between.
+    """
+
+    def __init__(
+        self,
+        max_workers=4,
+        retries=10,
+        backoff=0.5,
+        max_backoff=30.0,
+        timeout=30,
+        chunk_size=1 << 16,
+    ):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.chunk_size = chunk_size
+        self.pool = ConnectionPool(maxsize=max_workers, timeout=timeout)
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="download")
+        self.stats = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+        self.pool.close()
+
+    def delay(self, attempt: int):
+        """Exponential backoff with jitter, between half and the full step"""
+        step = min(self.max_backoff, self.backoff * 2**attempt)
+        return step * random.uniform(0.5, 1.0)
+
+    def download(self, url: str, path: str) -> TransferStats:
+        path = str(path)
+        os.makedirs(os.path.split(path)[0], exist_ok=True)
+        stats = TransferStats(url, path)
+        if os.path.exists(path):
+            logging.warning(f"{path} already exists, skip downloading")
+            stats.skipped = True
+            return stats
+        t0 = time.perf_counter()
+        for attempt in range(self.retries):
+            stats.attempts = attempt + 1
+            try:
+                logging.debug(f"start downloading {url} to {path}")
+                self.fetch(url, path, stats)
+                os.replace(path + ".tmp", path)
+                stats.seconds = time.perf_counter() - t0
+                logging.debug(f"successfully downloaded {stats}")
+                self.stats.append(stats)
+                return stats
+            except PermanentDownloadError:
+                raise
+            except Exception as e:
+                logging.warning(f"download {path} failed, retrying")
+                logging.warning(f"Exception: {e}")
+                if attempt + 1 < self.retries:
+                    time.sleep(self.delay(attempt))
+        raise DownloadError("Reached max retry time, download failed")
+
+    def fetch(self, url: str, path: str, stats: TransferStats, redirects=5):
+        tmp = path + ".tmp"
+        offset = os.path.getsize(tmp) if os.path.exists(tmp) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        resp, release = self.pool.request("GET", url, headers)
+        reuse, location = False, None
+        try:
+            if resp.status in REDIRECTS and redirects > 0:
+                resp.read()
+                reuse, location = True, urljoin(url, resp.getheader("Location"))
+            elif resp.status == 416:
+                # the tmp file does not match the remote any more, start over
+                resp.read()
+                reuse = True
+                os.remove(tmp)
+                raise DownloadError(f"HTTP 416 resuming {url} at {offset}")
+            elif resp.status not in (200, 206):
+                resp.read()
+                reuse = True
+                error = f"HTTP {resp.status} {resp.reason} for {url}"
+                if 400 <= resp.status < 500 and resp.status not in RETRYABLE:
+                    raise PermanentDownloadError(error)
+                raise DownloadError(error)
+            else:
+                stats.validators = validators(resp)
+                if resp.status == 206:
+                    match = CONTENT_RANGE.match(resp.getheader("Content-Range", ""))
+                    if match is None or int(match[1]) != offset:
+                        raise DownloadError(f"unexpected Content-Range for {url}")
+                    stats.resumed_from = offset
+                    if match[2]:
+                        stats.validators["Content-Length"] = match[2]
+                    else:
+                        stats.validators.pop("Content-Length", None)
+                else:
+                    offset = 0
+                length = resp.getheader("Content-Length")
+                received = 0
+                with open(tmp, "ab" if offset else "wb") as f:
+                    while chunk := resp.read(self.chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+                stats.size += received
+                if length is not None and received != int(length):
+                    raise DownloadError(f"incomplete read {received}/{length} of {url}")
+                reuse = True
+        finally:
+            release(reuse)
+        if location is not None:
+            self.fetch(location, path, stats, redirects - 1)
+
+    def head(self, url: str, redirects=5) -> Optional[dict]:
+        """Return the validators of ``url``, None if they cannot be fetched"""
+        try:
+            resp, release = self.pool.request("HEAD", url)
+            resp.read()
+            release()
+        except (http.client.HTTPException, OSError) as e:
+            logging.warning(f"HEAD {url} failed: {e}")
+            return None
+        if resp.status in REDIRECTS and redirects > 0:
+            return self.head(urljoin(url, resp.getheader("Location")), redirects - 1)
+        if resp.status != 200:
+            return None
+        return validators(resp)
+
+    def submit(self, url: str, path: str):
+        # run in the submitting context, e.g. to log to the output of its region
+        return self.executor.submit(copy_context().run, self.download, url, path)
+
+    def download_all(self, targets) -> list:
+        """Download ``(url, path)`` pairs concurrently, return their stats in order
+
+        Every transfer runs to completion before the first error is re-raised.
+        """
+        futures = [self.submit(url, path) for url, path in targets]
+        results, error = [], None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+
+def download(url, path):
+    with DownloadManager(max_workers=1) as manager:
+        manager.download(url, path)
     return path
 
+
 def download_multitask(x):
-    return download(*x)
\ No newline at end of file
+    return download(*x)
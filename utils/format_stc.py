@@ -1,9 +1,14 @@
 # %%
 import json
 import logging
+import mmap
 import os
 import struct
+from array import array
 from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from itertools import islice
+from typing import List, overload
 
 
 # %%
@@ -57,30 +62,221 @@ class StcReader:
         }[id]()
 
 
-def format_stc(stc: str, mapping: str, long=False):
-    with open(mapping, "r") as f:
-        stc_conf = json.load(f)
+STC_TYPES = {
+    1: "byte",
+    5: "int",
+    8: "long",
+    9: "float",
+    11: "string",
+}
+STC_STRING = 11
+# struct format char of each fixed-width stc type, also the array typecode of
+# its column in columnar tables
+STC_FORMATS = {1: "b", 5: "i", 8: "q", 9: "f"}
+# rows of fixed-size tables copied out of the map at a time by ``StcTable``
+STC_CHUNK = 4096
 
-    reader = StcReader(stc)
-    code = reader.read_ushort()
-    if not long:
-        reader.skip_bytes(2)
-    else:
-        reader.skip_bytes(4)
-    logging.debug(f"reading {os.path.split(stc)[-1]}, code {code}")
-    data = list()
+
+class StcPlan:
+    """Decoding plan compiled once per table from its ``type_ids`` header.
+
+    A row is split into segments at every string column. Each segment is one
+    precompiled ``struct.Struct`` covering the fixed-width columns before the
+    string plus the string prefix (1 skipped byte and a ushort length), so a
+    row costs one ``unpack_from`` per string column instead of one call per
+    cell. Tables without strings have a fixed row size and are decoded with a
+    single ``iter_unpack`` over the whole data block.
+    """
+
+    def __init__(self, type_ids):
+        self.type_ids = list(type_ids)
+        self.float_cols = [i for i, t in enumerate(self.type_ids) if t == 9]
+        self.segments = []
+        fmt = ""
+        for id in self.type_ids:
+            if id == STC_STRING:
+                self.segments.append((struct.Struct(f"<{fmt}xH"), True))
+                fmt = ""
+            else:
+                fmt += STC_FORMATS[id]
+        if fmt or not self.segments:
+            self.segments.append((struct.Struct(f"<{fmt}"), False))
+        self.fixed = STC_STRING not in self.type_ids
+        self.row_size = self.segments[0][0].size if self.fixed else None
+
+    def iter_rows(self, buf, offset, row, round_floats=True):
+        """Yield ``row`` value lists decoded from ``buf`` starting at ``offset``
+
+        Floats are rounded through ``"%g"`` like ``StcReader.read_float`` unless
+        ``round_floats`` is False, in which case the raw float32 values are kept.
+        """
+        float_cols = self.float_cols if round_floats else []
+        if self.fixed:
+            if self.row_size == 0:
+                yield from (() for _ in range(row))
+                return
+            end = offset + row * self.row_size
+            if end > len(buf):
+                raise struct.error(f"stc data truncated: {end} > {len(buf)} bytes")
+            rows = self.segments[0][0].iter_unpack(memoryview(buf)[offset:end])
+            if not float_cols:
+                yield from rows
+                return
+            for values in rows:
+                values = list(values)
+                for i in float_cols:
+                    values[i] = float("%g" % values[i])
+                yield values
+            return
+
+        size = len(buf)
+        pos = offset
+        segments = self.segments
+        for _ in range(row):
+            values = []
+            for st, has_str in segments:
+                vals = st.unpack_from(buf, pos)
+                pos += st.size
+                if has_str:
+                    end = pos + vals[-1]
+                    if end > size:
+                        raise struct.error(f"stc string truncated at {pos}")
+                    values.extend(vals[:-1])
+                    values.append(buf[pos:end].decode("utf-8"))
+                    pos = end
+                else:
+                    values.extend(vals)
+            for i in float_cols:
+                values[i] = float("%g" % values[i])
+            yield values
+
+
+def format_value(type_id, value):
+    return float("%g" % value) if type_id == 9 else value
+
+
+class StcRow(Mapping):
+    """Read-only view of one row of a ``StcColumns`` table"""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "StcColumns", index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key):
+        table = self.table
+        i = table.field_index[key]
+        return format_value(table.type_ids[i], table.columns[i][self.index])
+
+    def __iter__(self):
+        return iter(self.table.field_index)
+
+    def __len__(self):
+        return len(self.table.field_index)
+
+    def __repr__(self):
+        return f"StcRow({dict(self)})"
+
+
+class StcColumns:
+    """Columnar stc table, one typed array per column.
+
+    Numeric columns are stored as ``array`` of the stc width (floats are kept
+    as raw float32 and only rounded through ``"%g"`` when read back), string
+    columns as ``list``. Rows are exposed as lazy ``StcRow`` views and
+    ``to_records`` rebuilds the list of ``OrderedDict`` that ``format_stc``
+    returns by default.
+    """
+
+    def __init__(self, name, fields: list, type_ids: list, columns: list, row=0):
+        self.name = name
+        self.fields = fields
+        self.type_ids = type_ids
+        self.columns = columns
+        self.row = row
+        # duplicated field names resolve to the last column, as in record dicts
+        self.field_index = {}
+        for i, key in enumerate(fields):
+            self.field_index[key] = i
+
+    @classmethod
+    def from_rows(cls, name, fields, type_ids, rows, chunk=4096):
+        """Build the table from an iterable of row values, ``chunk`` rows at a time"""
+        columns = [
+            list() if id == STC_STRING else array(STC_FORMATS[id]) for id in type_ids
+        ]
+        rows = iter(rows)
+        row = 0
+        while True:
+            block = list(islice(rows, chunk))
+            if not block:
+                break
+            row += len(block)
+            for col, values in zip(columns, zip(*block)):
+                col.extend(values)
+        return cls(name, fields, type_ids, columns, row)
+
+    def __len__(self):
+        return self.row
+
+    def __getitem__(self, index: int) -> StcRow:
+        if index < 0:
+            index += self.row
+        if not 0 <= index < self.row:
+            raise IndexError("row index out of range")
+        return StcRow(self, index)
+
+    def __iter__(self):
+        return (StcRow(self, i) for i in range(self.row))
+
+    def column(self, key: str) -> list:
+        """Values of one column, formatted as in ``format_stc`` records"""
+        i = self.field_index[key]
+        if self.type_ids[i] == 9:
+            return [float("%g" % v) for v in self.columns[i]]
+        return list(self.columns[i])
+
+    def to_records(self) -> list:
+        columns = [
+            self.column(key) if id == 9 else col
+            for key, id, col in zip(self.fields, self.type_ids, self.columns)
+        ]
+        if not columns:
+            return [OrderedDict() for _ in range(self.row)]
+        return [OrderedDict(zip(self.fields, v)) for v in zip(*columns)]
+
+
+def read_stc_header(buf, long=False):
+    """Parse the stc header, return ``(code, row, type_ids, offset)``"""
+    code, = struct.unpack_from("<H", buf, 0)
+    pos = 4 if not long else 6
     if not long:
-        row = reader.read_ushort()
+        row, = struct.unpack_from("<H", buf, pos)
+        pos += 2
     else:
-        row = reader.read_int()
+        row, = struct.unpack_from("<i", buf, pos)
+        pos += 4
     if row == 0:
-        return stc_conf["name"], data
-    col = reader.read_byte()
-    logging.debug(f"col {col}, row {row}")
+        return code, row, [], None
+    col, = struct.unpack_from("<b", buf, pos)
+    pos += 1
+    type_ids = list(struct.unpack_from(f"<{max(col, 0)}b", buf, pos))
+    pos += max(col, 0) + 4
+    offset, = struct.unpack_from("<i", buf, pos)
+    return code, row, type_ids, offset
 
-    type_ids = []
-    for _ in range(col):
-        type_ids.append(reader.read_byte())
+
+def load_mapping(mapping) -> dict:
+    """``mapping`` itself if already loaded, else the json file at that path"""
+    if isinstance(mapping, dict):
+        return dict(mapping, fields=list(mapping["fields"]))
+    with open(mapping, "r") as f:
+        return json.load(f)
+
+
+def load_stc_conf(stc, mapping, type_ids, code):
+    stc_conf = load_mapping(mapping)
     if len(type_ids) < len(stc_conf["fields"]):
         logging.warning(f"redundant field in {os.path.split(stc)[-1]}, code {code}")
         stc_conf["fields"] = stc_conf["fields"][: len(type_ids)]
@@ -88,31 +284,195 @@ def format_stc(stc: str, mapping: str, long=False):
         logging.warning(f"unknown field in {os.path.split(stc)[-1]}, code {code}")
         for i in range(len(stc_conf["fields"]), len(type_ids)):
             stc_conf["fields"].append(f"unk_{i}")
+    return stc_conf
+
+
+def format_stc(stc: str, mapping, long=False, columnar=False):
+    """Decode ``stc`` with the field names in ``mapping``, return ``(name, data)``
+
+    ``mapping`` is the path of a mapping json or its already loaded content.
+    ``data`` is a list of ``OrderedDict`` records, or a ``StcColumns`` table
+    when ``columnar`` is set.
+    """
+    with open(stc, "rb") as f:
+        buf = f.read()
+    code, row, type_ids, offset = read_stc_header(buf, long)
+    logging.debug(f"reading {os.path.split(stc)[-1]}, code {code}")
+    if row == 0:
+        name = load_mapping(mapping)["name"]
+        return name, StcColumns(name, [], [], []) if columnar else list()
+    logging.debug(f"col {len(type_ids)}, row {row}")
+    stc_conf = load_stc_conf(stc, mapping, type_ids, code)
+    fields = stc_conf["fields"]
+    logging.debug(
+        f'{stc_conf["name"]}: '
+        f"{ {fields[i]: STC_TYPES[t] for i, t in enumerate(type_ids)} }"
+    )
 
-    format = {
-        stc_conf["fields"][i]: {
-            1: "byte",
-            5: "int",
-            8: "long",
-            9: "float",
-            11: "string",
-        }[type_ids[i]]
-        for i in range(col)
-    }
-    logging.debug(f'{stc_conf["name"]}: {format}')
-
-    reader.skip_bytes(4)
-    offset = reader.read_int()
-    reader.seek(offset)
-    for _ in range(row):
-        record = OrderedDict()
-        for key, id in zip(stc_conf["fields"], type_ids):
-            record[key] = reader.read(id)
-        logging.debug(record)
-        data.append(record)
+    plan = StcPlan(type_ids)
+    if columnar:
+        rows = plan.iter_rows(buf, offset, row, round_floats=False)
+        return stc_conf["name"], StcColumns.from_rows(
+            stc_conf["name"], fields, type_ids, rows
+        )
+    data = [OrderedDict(zip(fields, v)) for v in plan.iter_rows(buf, offset, row)]
     return stc_conf["name"], data
 
 
+class StcTable(Sequence):
+    """Random access to the rows of an stc file, decoded on demand
+
+    The file is memory-mapped and only its header is parsed on open. Rows of
+    tables without strings sit at a fixed stride, otherwise row offsets are
+    found by hopping over string lengths without decoding anything, and only
+    as far as the highest row asked for. Rows are ``OrderedDict`` records
+    formatted as in ``format_stc``, ``get`` looks them up by the value of the
+    first column, their primary key.
+    """
+
+    def __init__(self, stc, mapping=None, long=False):
+        self.path = stc
+        with open(stc, "rb") as f:
+            try:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty files cannot be mapped
+                self.buf = f.read()
+        self.code, self.row, type_ids, offset = read_stc_header(self.buf, long)
+        # no offset in the header of empty tables
+        self.offset: int = offset or 0
+        if mapping is None:
+            stem = os.path.splitext(os.path.basename(stc))[0]
+            conf = dict(name=stem, fields=[f"unk_{i}" for i in range(len(type_ids))])
+        elif self.row == 0:
+            conf = dict(name=load_mapping(mapping)["name"], fields=[])
+        else:
+            conf = load_stc_conf(stc, mapping, type_ids, self.code)
+        self.name = conf["name"]
+        self.fields = conf["fields"]
+        self.type_ids = type_ids
+        self.field_index = {key: i for i, key in enumerate(self.fields)}
+        self.plan = StcPlan(type_ids)
+        # segment and struct of every column, strings are the tail of a segment
+        self.cells = []
+        for seg, (st, has_str) in enumerate(self.plan.segments):
+            pos = 0
+            for fmt in st.format[1:].replace("xH", ""):
+                self.cells.append((seg, struct.Struct(f"<{fmt}"), pos))
+                pos += struct.calcsize(fmt)
+            if has_str:
+                self.cells.append((seg, None, st.size))
+        self.offsets = array("q", [self.offset])
+        self._keys = None
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.row
+
+    def row_offset(self, index: int) -> int:
+        """Byte offset of row ``index``, negative indexes count from the end"""
+        if index < 0:
+            index += self.row
+        if not 0 <= index < self.row:
+            raise IndexError("row index out of range")
+        if self.plan.row_size is not None:
+            return self.offset + index * self.plan.row_size
+        offsets, buf, segments = self.offsets, self.buf, self.plan.segments
+        pos = offsets[-1]
+        while len(offsets) <= index:
+            for st, has_str in segments:
+                pos += st.size
+                if has_str:
+                    pos += struct.unpack_from("<H", buf, pos - 2)[0]
+            if pos > len(buf):
+                raise struct.error(f"stc data truncated at row {len(offsets)}")
+            offsets.append(pos)
+        return offsets[index]
+
+    def values(self, index: int) -> list:
+        """Values of row ``index`` in column order"""
+        return list(next(self.decode(self.row_offset(index), 1)))
+
+    def decode(self, pos: int, row: int):
+        """Value lists of ``row`` rows starting at ``pos``
+
+        Fixed-size rows are unpacked from a copy of their bytes, ``iter_unpack``
+        would otherwise keep a view of the map that makes ``close`` fail with
+        BufferError while an iteration is left unfinished.
+        """
+        if self.plan.row_size is not None:
+            end = pos + row * self.plan.row_size
+            return self.plan.iter_rows(self.buf[pos:end], 0, row)
+        return self.plan.iter_rows(self.buf, pos, row)
+
+    @overload
+    def __getitem__(self, index: int) -> OrderedDict: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[OrderedDict]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.row))]
+        return OrderedDict(zip(self.fields, self.values(index)))
+
+    def __iter__(self):
+        if self.plan.fixed:
+            chunks = (
+                self.decode(self.row_offset(i), min(STC_CHUNK, self.row - i))
+                for i in range(0, self.row, STC_CHUNK)
+            )
+        else:
+            chunks = [self.decode(self.offset, self.row)]
+        for rows in chunks:
+            for values in rows:
+                yield OrderedDict(zip(self.fields, values))
+
+    def cell(self, index: int, key: str):
+        """Value of column ``key`` in row ``index``, other columns are skipped"""
+        return self._cell(self.row_offset(index), self.field_index[key])
+
+    def _cell(self, pos: int, col: int):
+        seg, st, start = self.cells[col]
+        for seg_struct, _ in self.plan.segments[:seg]:
+            pos += seg_struct.size
+            pos += struct.unpack_from("<H", self.buf, pos - 2)[0]
+        if st is None:
+            n = struct.unpack_from("<H", self.buf, pos + start - 2)[0]
+            return self.buf[pos + start : pos + start + n].decode("utf-8")
+        value, = st.unpack_from(self.buf, pos + start)
+        return format_value(self.type_ids[col], value)
+
+    def column(self, key: str) -> list:
+        """Values of one column, formatted as in ``format_stc`` records"""
+        col = self.field_index[key]
+        return [self._cell(self.row_offset(i), col) for i in range(self.row)]
+
+    @property
+    def keys(self) -> dict:
+        """Row index of every primary key, built on first use"""
+        if self._keys is None:
+            self._keys = {}
+            for i in range(self.row):
+                self._keys.setdefault(self._cell(self.row_offset(i), 0), i)
+        return self._keys
+
+    def get(self, key, default=None):
+        """Record whose first column is ``key``, its first one if repeated"""
+        if not self.row or not self.type_ids:
+            return default
+        index = self.keys.get(key)
+        return default if index is None else self[index]
+
+
 # %%
 if __name__ == "__main__":
     logging.basicConfig(level="DEBUG")
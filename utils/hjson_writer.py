@@ -0,0 +1,35 @@
+import re
+from typing import Iterator
+
+import hjson
+
+# blank lines only occur inside multiline strings and carry no indent
+NEWLINE = re.compile(r"\n(?!\n)")
+INDENT = "  "
+
+
+def _indent(s: str) -> str:
+    if "\n\n" in s:
+        return NEWLINE.sub("\n" + INDENT, s)
+    return s.replace("\n", "\n" + INDENT)
+
+
+def iter_hjson(obj) -> Iterator[str]:
+    """Chunks of ``hjson.dumps(obj)``, one per item when ``obj`` is a list
+
+    hjson indents every line of an item by one level more inside the list, so
+    each item is encoded on its own and shifted instead of encoding the whole
+    document at once.
+    """
+    if not isinstance(obj, list) or not obj:
+        yield hjson.dumps(obj)
+        return
+    yield "["
+    for item in obj:
+        yield "\n" + INDENT + _indent(hjson.dumps(item))
+    yield "\n]"
+
+
+def dump_hjson(obj, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(iter_hjson(obj))
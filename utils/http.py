@@ -0,0 +1,148 @@
+import http.client
+import json
+import ssl
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.error import HTTPError
+from urllib.parse import urljoin
+
+from utils.download import REDIRECTS, ConnectionPool
+
+
+@dataclass
+class Response:
+    url: str
+    status: int
+    reason: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    data: bytes = b""
+
+    def text(self, encoding="utf-8") -> str:
+        return self.data.decode(encoding)
+
+    def json(self):
+        return json.loads(self.data)
+
+    def raise_for_status(self) -> "Response":
+        """Raise an ``HTTPError`` like ``urlopen`` does for error statuses"""
+        if self.status >= 400:
+            headers = http.client.HTTPMessage()
+            for name, value in self.headers.items():
+                headers[name] = value
+            raise HTTPError(self.url, self.status, self.reason, headers, None)
+        return self
+
+
+def encode_multipart(fields: Dict[str, str]):
+    """``(body, content type)`` of a multipart/form-data form of text ``fields``"""
+    boundary = uuid.uuid4().hex
+    body = b"".join(
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+        f"{value}\r\n".encode("utf-8")
+        for name, value in fields.items()
+    )
+    body += f"--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class InsecureConnectionPool(ConnectionPool):
+    """``ConnectionPool`` whose https connections skip certificate checks"""
+
+    def connect(self, scheme, netloc):
+        if scheme != "https":
+            return super().connect(scheme, netloc)
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return http.client.HTTPSConnection(
+            netloc, timeout=self.timeout, context=context
+        )
+
+
+class HttpClient:
+    """Small requests for metadata over shared keep-alive connections
+
+    Connections are pooled per host and reused across calls and regions,
+    ``submit`` runs a call on the client's threads, in a copy of the caller's
+    context, and returns a future so that independent calls can be in flight
+    together. Hosts reached with
+    ``verify=False`` get a pool of their own that skips certificate checks.
+    """
+
+    def __init__(self, max_workers=16, maxsize=4, timeout=10):
+        self.pool = ConnectionPool(maxsize=maxsize, timeout=timeout)
+        self.insecure = InsecureConnectionPool(maxsize=maxsize, timeout=timeout)
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="http")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+        self.pool.close()
+        self.insecure.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[bytes] = None,
+        verify=True,
+        redirects=5,
+    ) -> Response:
+        """Send a request and read its whole response, following redirects"""
+        pool = self.pool if verify else self.insecure
+        resp, release = pool.request(method, url, headers, body)
+        try:
+            data = resp.read()
+        except BaseException:
+            release(False)
+            raise
+        release()
+        if resp.status in REDIRECTS and redirects > 0:
+            location = urljoin(url, resp.getheader("Location"))
+            # like urlopen, only 307 and 308 repeat a POST
+            if resp.status not in (307, 308) and method != "HEAD":
+                method, body = "GET", None
+            return self.request(method, location, headers, body, verify, redirects - 1)
+        return Response(url, resp.status, resp.reason, dict(resp.getheaders()), data)
+
+    def get(self, url: str, headers=None, verify=True) -> Response:
+        return self.request("GET", url, headers, verify=verify).raise_for_status()
+
+    def post(
+        self, url: str, data=None, fields=None, headers=None, verify=True
+    ) -> Response:
+        """POST raw bytes, a json ``data`` object or multipart form ``fields``"""
+        headers = dict(headers or {})
+        if fields is not None:
+            data, headers["Content-Type"] = encode_multipart(fields)
+        elif data is not None and not isinstance(data, bytes):
+            data = json.dumps(data).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        return self.request("POST", url, headers, data, verify).raise_for_status()
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        return self.executor.submit(copy_context().run, func, *args, **kwargs)
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def shared_client() -> HttpClient:
+    """The client shared by every region of the process, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,94 @@
+import json
+import logging
+import re
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes exponents as 1e16/1e-7 and small numbers as 0.00001, where
+# float.__repr__ gives 1e+16/1e-07/1e-05. In indented output every number
+# sits alone after a space at the end of its line, strings never do.
+FLOAT_FIXUP = re.compile(rb"(?m)(?<= )-?(?:\d+(?:\.\d+)?e-?\d+|0\.0000\d+)(?=,?$)")
+# cheap literal-first scans telling whether FLOAT_FIXUP can match at all
+EXPONENT = re.compile(rb"e-?\d+,?\n")
+
+
+def _float_repr(match: re.Match) -> bytes:
+    return repr(float(match[0])).encode()
+
+
+def _double_indent(out: bytes) -> bytes:
+    """Turn orjson's 2 space indent into 4, one ``bytes.replace`` per level
+
+    Raw newlines only occur as line breaks, ``\\x01`` never occurs at all and
+    marks lines already done so shallower levels do not match them again.
+    """
+    depth = 0
+    while b"\n" + b"  " * (depth + 1) in out:
+        depth += 1
+    for level in range(depth, 0, -1):
+        out = out.replace(b"\n" + b"  " * level, b"\n\x01" + b"    " * level)
+    return out.replace(b"\x01", b"")
+
+
+def _has_nonfinite(obj) -> bool:
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, float):
+            # NaN - NaN and inf - inf are both NaN
+            if obj - obj != 0:
+                return True
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+
+def dumps_stdlib(obj, indent=4) -> bytes:
+    return json.dumps(obj, indent=indent, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_orjson(obj, indent=4) -> Optional[bytes]:
+    """``dumps_stdlib`` on top of orjson, None where the outputs would differ
+
+    That is for top level scalars, indents other than 2 and 4, non-str keys,
+    integers beyond 64 bit, lone surrogates and NaN/Infinity, which orjson
+    rejects or writes as null, and when orjson is not installed.
+    """
+    if orjson is None or indent not in (2, 4) or not isinstance(obj, (dict, list)):
+        return None
+    try:
+        out = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    except TypeError:
+        return None
+    if b"null" in out and _has_nonfinite(obj):
+        return None
+    if b" 0.0000" in out or b" -0.0000" in out or EXPONENT.search(out):
+        out = FLOAT_FIXUP.sub(_float_repr, out)
+    if indent == 4:
+        out = _double_indent(out)
+    return out
+
+
+def dumps(obj, indent=4) -> bytes:
+    """UTF-8 bytes of ``json.dumps(obj, indent=indent, ensure_ascii=False)``
+
+    Uses orjson when it is installed and falls back to the stdlib encoder for
+    anything orjson cannot reproduce byte for byte.
+    """
+    if orjson is not None:
+        out = dumps_orjson(obj, indent)
+        if out is not None:
+            return out
+        logging.debug("orjson cannot reproduce json.dumps here, using stdlib")
+    return dumps_stdlib(obj, indent)
+
+
+def dump(obj, path, indent=4):
+    with open(path, "wb") as f:
+        f.write(dumps(obj, indent))
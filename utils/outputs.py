@@ -0,0 +1,160 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+
+def file_digest(path, chunk_size=1 << 20) -> bytes:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.digest()
+
+
+def write_if_changed(path, data: bytes) -> Optional[str]:
+    """Write ``data`` to ``path`` unless it already holds exactly that
+
+    Return ``CREATED`` or ``MODIFIED``, None if the file was left untouched.
+    Changed files are written to a temporary name and renamed into place.
+    """
+    path = str(path)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        status = CREATED
+    else:
+        if size == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return None
+        status = MODIFIED
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return status
+
+
+def replace_if_changed(tmp, path) -> Optional[str]:
+    """Rename ``tmp`` over ``path`` unless their content hashes are equal
+
+    An identical ``tmp`` is removed instead, so ``path`` keeps its mtime.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        status = CREATED
+    else:
+        if size == os.path.getsize(tmp) and file_digest(tmp) == file_digest(path):
+            os.remove(tmp)
+            return None
+        status = MODIFIED
+    os.replace(tmp, path)
+    return status
+
+
+class ChangeSet:
+    """Outputs of one run in a data repo, and which of them changed
+
+    Every output goes through ``write``, ``replace`` or ``record`` so that
+    ``seen`` holds all files produced by the run and ``changes`` those that
+    were created, modified or deleted, keyed by their posix path relative to
+    ``root``. ``tracked`` paths are known to exist in the repo even if they
+    are not checked out, sweeps delete them like files on disk.
+    """
+
+    def __init__(self, root, tracked=()):
+        self.root = Path(root)
+        self.tracked: Set[str] = set(tracked)
+        self.seen: Set[str] = set()
+        self.changes: Dict[str, str] = {}
+        # totals over the run, for the stage stats
+        self.written_files = 0
+        self.written_bytes = 0
+        self.deleted_files = 0
+
+    def seed(self, pending: Dict[str, str]):
+        """Start from changes made before this run, as ``{key: status}``
+
+        Outputs the run finds already up to date on disk are then still
+        committed, as are pending files the run does not touch.
+        """
+        for key, status in pending.items():
+            self.changes.setdefault(key, status)
+
+    def key(self, path) -> str:
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def record(self, path, status: Optional[str]):
+        key = self.key(path)
+        if status != DELETED:
+            self.seen.add(key)
+        else:
+            self.seen.discard(key)
+        if status is None:
+            return
+        if status == DELETED:
+            self.deleted_files += 1
+        else:
+            self.written_files += 1
+            self.written_bytes += os.path.getsize(path)
+        prev = self.changes.get(key)
+        if prev == CREATED and status == MODIFIED:
+            return
+        if prev == CREATED and status == DELETED and key not in self.tracked:
+            del self.changes[key]
+        elif prev == DELETED and status == CREATED:
+            self.changes[key] = MODIFIED
+        else:
+            self.changes[key] = status
+
+    def write(self, path, data: bytes) -> Optional[str]:
+        status = write_if_changed(path, data)
+        self.record(path, status)
+        return status
+
+    def replace(self, tmp, path) -> Optional[str]:
+        status = replace_if_changed(tmp, path)
+        self.record(path, status)
+        return status
+
+    def delete(self, path):
+        path = Path(path)
+        if path.is_file() or path.is_symlink():
+            path.unlink()
+        elif self.key(path) not in self.tracked:
+            return
+        self.record(path, DELETED)
+
+    def sweep(self, *paths):
+        """Delete files at or under ``paths`` that this run did not produce"""
+        for path in paths:
+            path = self.root / path
+            prefix = self.key(path)
+            if path.is_dir():
+                found = {self.key(p) for p in path.rglob("*") if not p.is_dir()}
+            else:
+                found = {prefix} if path.exists() else set()
+            found.update(
+                k for k in self.tracked if k == prefix or k.startswith(prefix + "/")
+            )
+            for key in sorted(found - self.seen):
+                self.delete(self.root / key)
+            if path.is_dir():
+                for d in sorted(path.rglob("*"), reverse=True):
+                    if d.is_dir() and not any(d.iterdir()):
+                        d.rmdir()
+                if not any(path.iterdir()):
+                    path.rmdir()
+
+    def paths(self, *statuses):
+        """Sorted changed paths, restricted to ``statuses`` if given"""
+        return sorted(
+            k for k, v in self.changes.items() if not statuses or v in statuses
+        )